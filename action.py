@@ -1,3 +1,4 @@
+import atexit
 import game.base2048 as base
 import game.AI2048 as AI2048
 import game.tip2048 as tip2048
@@ -6,12 +7,29 @@ from sound.sound import *
 from show.show import *
 from show.showConfig import *
 import show.showConfig as shc
+from game.replay import replayWriter
+
+shc.init() # 打开窗口，创建图像块、字体和按键风格，按键需要在此之后创建
 
 # 系统时间 #
 clock = pygame.time.Clock()
 # 实例化board对象，传递参数size = 4
 board = Board(SIZE) 
 
+def recordReplay(path):
+    """
+    录像
+    
+    之后的每一局（Base、Tip和AI模式都一样）追加到path录像文件中，从一个新的棋盘开始记录
+
+    返回值:
+        replayWriter对象
+    """
+    board.replay = replayWriter(path)
+    atexit.register(board.replay.close) # 退出时写入最后一局
+    board.__init__(SIZE) # 重新开始，记录种子和初始棋盘
+    return board.replay
+
 def btnBase():
     """
     Base按键回调函数
@@ -24,9 +42,12 @@ def btnBase():
     while not board.over():
         clock.tick(60) # fps
         GameState, tip = base.start_base_2048(board, buttonGroup, extip = tip) # 调用Base模式，第三个参数为当前tip索引
+        tip = tip2048.poll_tip(board, tip) # 后台提示搜索完成后更新tip
+        tip2048.ponder_tip(board) # 玩家思考时预先搜索
         showAll(board, button = buttonGroup, operation = tip) # 显示
         if GameState:
             break
+    tip2048.stop_tip() # 结束或New之后不再需要提示
     if not GameState:
         tip = 5 # Game over
         failSound() 
@@ -42,10 +63,10 @@ def btnTip():
     Tip按键回调函数
     
     实现Tip按键按下后的具体事件，即在base模式下进行tip提醒
-    只可在Base模式下有效果
+    只可在Base模式下有效果，搜索在后台进行，结果由btnBase中的poll_tip更新
 
     返回值: 
-        AI算法后的执行操作索引
+        搜索完成前的tip索引
     """
     tip = tip2048.tip_2048(board) # 调用tip
     return tip
@@ -84,8 +105,8 @@ def btnNew():
     return True
 
 # 实例化按键 传递参数按键位置大小，颜色，回调函数，显示文字，其他配置 #
-buttonBase = Button((10,90,70,40), buttonColorMap[0], btnBase, text="Base", **BUTTON_STYLE)
-buttonTip = Button((100,90,70,40),  buttonColorMap[0], btnTip, text="Tip", **BUTTON_STYLE)
-buttonAI = Button((190,90,70,40),  buttonColorMap[0], btnAI, text="AI", **BUTTON_STYLE)
-buttonNew = Button((280,90,70,40),  buttonColorMap[0], btnNew, text="New", **BUTTON_STYLE)
+buttonBase = Button((10,90,70,40), buttonColorMap[0], btnBase, text="Base", **shc.BUTTON_STYLE)
+buttonTip = Button((100,90,70,40),  buttonColorMap[0], btnTip, text="Tip", **shc.BUTTON_STYLE)
+buttonAI = Button((190,90,70,40),  buttonColorMap[0], btnAI, text="AI", **shc.BUTTON_STYLE)
+buttonNew = Button((280,90,70,40),  buttonColorMap[0], btnNew, text="New", **shc.BUTTON_STYLE)
 buttonGroup = [buttonBase,buttonTip,buttonAI,buttonNew]
@@ -1,6 +1,5 @@
 import numbers
 import numpy as np
-from pygame.math import enable_swizzling
 
 def newton(f, x=0.5, target=0, max=100, err=0.0001):  # 牛顿法寻找函数对应函数值的自变量值，用于解贝塞尔曲线的对应时间值
     n = 0
@@ -36,15 +35,42 @@ def mySigmode(x, scale=10):  # sigmode函数，也是一种缓动曲线
 def mySin(x):
     return 0.5*np.sin((x-0.5)*np.pi)+0.5
 
+# 缓动函数的查找表，{(缓动函数, 总帧数): [第0帧到第totalTime+1帧的函数值]}
+# 动画结束后还会再取一次第totalTime+1帧，所以多算一帧
+easingTables = {}
+
+
+def easingTable(function, totalTime):
+    """
+    缓动函数的查找表
+    功能:
+        对每种缓动函数和总帧数只计算一次，之后每一帧直接查表，不再运行牛顿法
+    返回值:
+        列表，第i项为function(i/totalTime)
+    """
+    key = (function, totalTime)
+    if key not in easingTables:
+        easingTables[key] = [function(i/totalTime)
+                             for i in range(totalTime + 2)]
+    return easingTables[key]
+
+
+def easing(function, nowTime, totalTime):  # 当前时间的缓动值，整数帧查表，其余情况直接计算
+    if isinstance(nowTime, int) and isinstance(totalTime, int) and 0 <= nowTime <= totalTime + 1:
+        return easingTable(function, totalTime)[nowTime]
+    return function(nowTime/totalTime)
+
+
 # 定义的缓动的移动，输入起始，终点位置，总时间，当前时间以及对应的缓动函数，返回的是当前应在的位置
 # 支持输入列表，元组，数字
 def smoothMove(startPos, endPos, nowTime, totalTime, function=myCubicBezier):
+    value = easing(function, nowTime, totalTime)
     if isinstance(startPos, numbers.Number) and isinstance(endPos, numbers.Number):
-        return (endPos-startPos)*(function(nowTime/totalTime))+startPos
+        return (endPos-startPos)*value+startPos
     elif isinstance(startPos, list) and isinstance(endPos, list):
-        return [int(startPos[i]+(endPos[i]-startPos[i])*(function(nowTime/totalTime))+0.5) for i in range(0, len(startPos))]
+        return [int(startPos[i]+(endPos[i]-startPos[i])*value+0.5) for i in range(0, len(startPos))]
     elif isinstance(startPos, tuple) and isinstance(endPos, tuple):
-        return tuple((int(startPos[i]+(endPos[i]-startPos[i])*(function(nowTime/totalTime))+0.5) for i in range(0, len(startPos))))
+        return tuple((int(startPos[i]+(endPos[i]-startPos[i])*value+0.5) for i in range(0, len(startPos))))
 
 # 动画类，可以方便调用，并且支持nowTick自增
 
@@ -57,17 +83,35 @@ class anime:
         self.func = func
         if totalTime == 0:
             self.finished = True
+            self.table = None
         else:
             self.finished = False
+            self.table = easingTable(func, totalTime) if isinstance(
+                totalTime, int) else None
         self.nowTime = 0
+        # 位置的类型在创建时判断一次，之后每一帧不再判断
+        if isinstance(startPos, numbers.Number) and isinstance(endPos, numbers.Number):
+            self.kind = 0
+        elif isinstance(startPos, list) and isinstance(endPos, list):
+            self.kind = 1
+        elif isinstance(startPos, tuple) and isinstance(endPos, tuple):
+            self.kind = 2
+        else:
+            self.kind = -1
 
     def PosNow(self, nowTime):  # 返回当前位置
-        if isinstance(self.startPos, numbers.Number) and isinstance(self.endPos, numbers.Number):
-            return (self.endPos-self.startPos)*(self.func(nowTime/self.totalTime))+self.startPos
-        elif isinstance(self.startPos, list) and isinstance(self.endPos, list):
-            return [int(self.startPos[i]+(self.endPos[i]-self.startPos[i])*(self.func(nowTime/self.totalTime))+0.5) for i in range(0, len(self.startPos))]
-        elif isinstance(self.startPos, tuple) and isinstance(self.endPos, tuple):
-            return tuple((int(self.startPos[i]+(self.endPos[i]-self.startPos[i])*(self.func(nowTime/self.totalTime))+0.5) for i in range(0, len(self.startPos))))
+        if self.table is not None and isinstance(nowTime, int) and 0 <= nowTime < len(self.table):
+            value = self.table[nowTime]  # 查表
+        elif self.kind < 0:
+            return None
+        else:
+            value = self.func(nowTime/self.totalTime)
+        if self.kind == 0:
+            return (self.endPos-self.startPos)*value+self.startPos
+        elif self.kind == 1:
+            return [int(self.startPos[i]+(self.endPos[i]-self.startPos[i])*value+0.5) for i in range(0, len(self.startPos))]
+        elif self.kind == 2:
+            return tuple((int(self.startPos[i]+(self.endPos[i]-self.startPos[i])*value+0.5) for i in range(0, len(self.startPos))))
 
     def move(self):  # 返回位置的同时将nowtime自增
         Pos = self.PosNow(self.nowTime)
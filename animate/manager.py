@@ -0,0 +1,123 @@
+import numpy as np
+from animate.animate import easingTable, myCubicBezier, mySigmode, mySin
+
+# 缓动函数编号，动画中只保存编号
+easings = [myCubicBezier, mySigmode, mySin]
+
+
+def easingId(function):  # 缓动函数对应的编号，新的函数第一次使用时加入列表
+    if function is None:
+        return 0
+    if function not in easings:
+        easings.append(function)
+    return easings.index(function)
+
+
+class animeManager:
+    """
+    动画管理器
+    功能:
+        所有数值块的滑动动画的起点、终点、开始帧、总帧数和缓动函数编号都保存在NumPy数组中，
+        每一帧用一次向量化计算得到所有动画的位置，不再逐个调用anime.move
+        动画第k帧的位置与anime.move第k次调用的返回值相同，结束后停在第totalTime+1帧
+    参数:
+        capacity:初始容量，不够时自动加倍
+    """
+
+    def __init__(self, capacity=64):
+        self.frame = 0  # 当前帧编号，每一帧结束时调用tick加一
+        self.start = np.zeros((capacity, 2))
+        self.end = np.zeros((capacity, 2))
+        self.startFrame = np.zeros(capacity, dtype=np.int64)
+        self.duration = np.zeros(capacity, dtype=np.int64)
+        self.easing = np.zeros(capacity, dtype=np.int64)
+        self.used = np.zeros(capacity, dtype=bool)
+        self.values = np.zeros((0, 0, 0))  # 缓动值查找表，[缓动函数编号, 总帧数, 帧]
+        self.filled = set()  # 查找表中已经填好的(缓动函数编号, 总帧数)
+
+    def __len__(self):  # 正在使用的动画数
+        return int(self.used.sum())
+
+    def grow(self):
+        capacity = len(self.used)
+        self.start = np.concatenate([self.start, np.zeros((capacity, 2))])
+        self.end = np.concatenate([self.end, np.zeros((capacity, 2))])
+        for name in ['startFrame', 'duration', 'easing']:
+            setattr(self, name, np.concatenate(
+                [getattr(self, name), np.zeros(capacity, dtype=np.int64)]))
+        self.used = np.concatenate([self.used, np.zeros(capacity, dtype=bool)])
+
+    def table(self, easing, duration):  # 确保查找表中有该缓动函数和总帧数的一行
+        shape = self.values.shape
+        if easing >= shape[0] or duration >= shape[1]:
+            values = np.zeros((max(shape[0], len(easings)), max(shape[1], duration + 1),
+                               max(shape[2], duration + 2)))
+            values[:shape[0], :shape[1], :shape[2]] = self.values
+            self.values = values
+        if (easing, duration) not in self.filled:
+            if duration == 0:  # 没有时长的动画直接在终点
+                self.values[easing, 0, :] = 1.0
+            else:
+                self.values[easing, duration, :duration + 2] = easingTable(
+                    easings[easing], duration)
+                self.values[easing, duration, duration + 2:] = self.values[easing, duration, duration + 1]
+            self.filled.add((easing, duration))
+
+    def add(self, startPos, endPos, totalTime, function=None):
+        """
+        添加一个从当前帧开始的动画
+        参数:
+            startPos,endPos:起点和终点的像素坐标
+            totalTime:总帧数
+            function:缓动函数，默认为myCubicBezier
+        返回值:
+            动画编号
+        """
+        free = np.flatnonzero(~self.used)
+        if len(free) == 0:
+            self.grow()
+            free = np.flatnonzero(~self.used)
+        slot = int(free[0])
+        easing = easingId(function)
+        self.table(easing, totalTime)
+        self.start[slot] = startPos
+        self.end[slot] = endPos
+        self.startFrame[slot] = self.frame
+        self.duration[slot] = totalTime
+        self.easing[slot] = easing
+        self.used[slot] = True
+        return slot
+
+    def free(self, slot):  # 释放动画编号，slot为None时不做任何事
+        if slot is not None:
+            self.used[slot] = False
+
+    def same(self, slot, startPos, endPos):  # 动画的起点和终点是否与给出的相同
+        return (self.start[slot, 0] == startPos[0] and self.start[slot, 1] == startPos[1] and
+                self.end[slot, 0] == endPos[0] and self.end[slot, 1] == endPos[1])
+
+    def step(self, slots):
+        """
+        一次计算多个动画在当前帧的位置
+        参数:
+            slots:动画编号列表
+        返回值:
+            positions:(n,2)的整数像素坐标，与anime.PosNow的取整方式相同
+            finished:(n,)，本帧之后动画是否已经结束
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        duration = self.duration[slots]
+        elapsed = self.frame - self.startFrame[slots]
+        value = self.values[self.easing[slots], duration,
+                            np.minimum(elapsed, duration + 1)]
+        start = self.start[slots]
+        positions = (start + (self.end[slots] - start) *
+                     value[:, None] + 0.5).astype(np.int64)  # 与int()一样向零取整
+        return positions, elapsed + 1 > duration
+
+    def tick(self):  # 一帧结束
+        self.frame += 1
+
+
+# 默认的动画管理器，数值块的动画都保存在这里
+manager = animeManager()
@@ -0,0 +1,3 @@
+from benchmark.bench import run, compare, save, load
+from benchmark.corpus import makeCorpus, stageOf, STAGES
+from benchmark.imports import checkImports, measureImport
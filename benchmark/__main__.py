@@ -0,0 +1,64 @@
+import argparse
+import sys
+from benchmark.bench import run, compare, save, load
+from benchmark.imports import checkImports
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmark', description='2048 benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+    runParser = sub.add_parser('run', help='运行测试并保存为JSON')
+    runParser.add_argument('-o', '--output', default='benchmark.json', help='结果文件')
+    runParser.add_argument('-n', '--per-stage', type=int, default=20, help='每个阶段的局面数')
+    runParser.add_argument('-d', '--depths', type=int, nargs='+', default=[2, 3, 4, 5],
+                           help='getBestMove测试的深度')
+    runParser.add_argument('--search-boards', type=int, default=4,
+                           help='每个阶段用于getBestMove测试的局面数')
+    runParser.add_argument('-r', '--repeat', type=int, default=3, help='快速函数的重复次数')
+    runParser.add_argument('-s', '--seed', type=int, default=0, help='语料的随机种子')
+    compareParser = sub.add_parser('compare', help='比较两次结果，出现退化时返回1')
+    compareParser.add_argument('old')
+    compareParser.add_argument('new')
+    compareParser.add_argument('-t', '--threshold', type=float, default=0.1,
+                               help='相对变化超过该比例视为退化')
+    compareParser.add_argument('-k', '--key', default='p50_us',
+                               help='比较的指标，如mean_us、p90_us、nodes')
+    importParser = sub.add_parser('imports', help='检查导入时间和导入时的pygame副作用，超出上限时返回1')
+    importParser.add_argument('-r', '--repeat', type=int, default=3, help='每个模块的测量次数')
+    importParser.add_argument('--scale', type=float, default=1.0, help='时间上限的倍数')
+    args = parser.parse_args()
+
+    if args.command == 'imports':
+        rows = checkImports(args.repeat, args.scale)
+        for module, ms, budget, pygame, display, ok in rows:
+            print('{:<6} {:<15} {:>8.1f}ms / {:>6.0f}ms  pygame={} display={}'.format(
+                'ok' if ok else 'FAIL', module, ms, budget, pygame, display))
+        return 0 if all(row[-1] for row in rows) else 1
+
+    if args.command == 'run':
+        result = run(args.per_stage, args.depths, args.search_boards, args.repeat, args.seed)
+        save(result, args.output)
+        for name, item in result['results'].items():
+            line = '{:<45} p50 {:>12.2f}us  p99 {:>12.2f}us  {:>12.1f} ops/s'.format(
+                name, item['p50_us'], item['p99_us'], item['ops_per_sec'])
+            if 'nodes_per_sec' in item:
+                line += '  {:>10.0f} nodes/s'.format(item['nodes_per_sec'])
+            if 'cutoff_rate' in item:
+                line += '  {:>6.1%} cutoffs'.format(item['cutoff_rate'])
+            print(line)
+        return 0
+
+    rows = compare(load(args.old), load(args.new), args.threshold, args.key)
+    regressions = 0
+    for name, oldValue, newValue, ratio, state in rows:
+        if state != 'same':
+            print('{:<12} {:<45} {:>12.2f} -> {:>12.2f}  x{:.2f}'.format(
+                state, name, oldValue, newValue, ratio))
+        regressions += state == 'regression'
+    print('{} benchmarks, {} regressions'.format(len(rows), regressions))
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
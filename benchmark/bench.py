@@ -0,0 +1,203 @@
+import json
+import platform
+import time
+import game.val as val
+from board.board import Board, lineProcess
+from game.map import AIMap, BitMap, islands, bitIslands, encode
+from game.search import searchBestMove, transTable
+from benchmark.corpus import makeCorpus
+
+DIRECTIONS = ['up', 'down', 'left', 'right']
+EXPECTIMAX_MAX_DEPTH = 3  # expectimax的节点数随深度增长很快，更深的层只测minimax
+
+
+def percentile(samples, p):  # samples需已排序
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def summary(samples, nodes=None, cutoffs=None):
+    """
+    整理一组计时结果
+    参数:
+        samples:每次调用的耗时，单位秒
+        nodes:每次调用搜索的位置数，只有搜索类的测试才有
+        cutoffs:每次调用的剪枝次数
+    返回值:
+        包含调用次数、平均值和百分位数（微秒）以及每秒次数的字典
+    """
+    samples = sorted(samples)
+    total = sum(samples)
+    result = {'calls': len(samples),
+              'mean_us': total / len(samples) * 1e6,
+              'p50_us': percentile(samples, 50) * 1e6,
+              'p90_us': percentile(samples, 90) * 1e6,
+              'p99_us': percentile(samples, 99) * 1e6,
+              'ops_per_sec': len(samples) / total if total > 0 else 0}
+    if nodes is not None:
+        result['nodes'] = sum(nodes)
+        result['nodes_per_sec'] = sum(nodes) / total if total > 0 else 0
+    if cutoffs is not None:
+        result['cutoffs'] = sum(cutoffs)
+        result['cutoff_rate'] = sum(cutoffs) / sum(nodes) if nodes and sum(nodes) > 0 else 0
+    return result
+
+
+def timeCalls(function, args, repeat=1):  # 对每组参数计时，返回耗时列表
+    samples = []
+    for arg in args:
+        for i in range(repeat):
+            start = time.perf_counter()
+            function(arg)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def timeMoves(make, move, numMaps):  # 移动会修改棋盘，所以每次计时前重新生成棋盘
+    samples = []
+    for numMap in numMaps:
+        board = make(numMap)
+        start = time.perf_counter()
+        move(board)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def leafBitMap(bitMap):  # 搜索最底层的工作：四个方向各复制、移动并整盘查表评价
+    for dir in range(4):
+        child = bitMap.copy()
+        if child.move(dir):
+            val.tableEvaluation(child.board)
+
+
+def spawnBitMap(bitMap):  # min轮的工作：每个空格放置2后计算smothness再删除
+    for [x, y] in bitMap.getAvailableCells():
+        bitMap.add_xy(x, y, 2)
+        val.tableSmothness(bitMap.board)
+        bitMap.remove_xy(x, y)
+
+
+def benchStage(numMaps, repeat):
+    """
+    对一个阶段的局面测试移动、评价函数和islands
+    返回值:
+        {测试名: summary}
+    """
+    results = {}
+    aiMaps = [AIMap(4, numMap).map for numMap in numMaps]  # AI中使用的方向
+    lines = [[numMap[i][j] for j in range(4)]
+             for numMap in numMaps for i in range(4)]
+    results['lineProcess'] = summary(timeCalls(lineProcess, lines, repeat))
+    for dir in range(4):
+        results['Board.move_' + DIRECTIONS[dir]] = summary(
+            timeMoves(lambda numMap: Board(4, numMap), lambda board: board.move(dir), numMaps * repeat))
+        results['AIMap.move_' + DIRECTIONS[dir]] = summary(
+            timeMoves(lambda numMap: AIMap(4, numMap), getattr(AIMap, 'move_' + DIRECTIONS[dir]), numMaps * repeat))
+        results['BitMap.move_' + DIRECTIONS[dir]] = summary(
+            timeMoves(lambda numMap: BitMap(4, numMap), getattr(BitMap, 'move_' + DIRECTIONS[dir]), numMaps * repeat))
+    for name in ['dis_weight', 'smothness', 'monotonicity', 'empty_num', 'max_num', 'evaluation']:
+        usable = [map for map in aiMaps if name !=
+                  'evaluation' or val.empty_num(map) > 0]  # 没有空格时evaluation中的log(0)无意义
+        if len(usable) > 0:
+            results['val.' + name] = summary(
+                timeCalls(getattr(val, name), usable, repeat))
+    boards = [encode(map) for map in aiMaps if val.empty_num(map) > 0]
+    if len(boards) > 0:
+        results['val.tableEvaluation'] = summary(
+            timeCalls(val.tableEvaluation, boards, repeat))
+        bitMaps = [BitMap(4, board=board) for board in boards]
+        results['leaf.BitMap'] = summary(timeCalls(leafBitMap, bitMaps, repeat))
+        results['spawn.BitMap'] = summary(timeCalls(spawnBitMap, bitMaps, repeat))
+        results['spawn.spawnScores'] = summary(timeCalls(val.spawnScores, boards, repeat))
+    results['islands'] = summary(timeCalls(islands, aiMaps, repeat))
+    results['bitIslands'] = summary(timeCalls(
+        bitIslands, [encode(map) for map in aiMaps], repeat))
+    return results
+
+
+def benchSearch(numMaps, depths):
+    """
+    对一个阶段的局面测试完整的搜索，每个局面使用新的置换表
+    返回值:
+        {测试名: summary}，额外包含搜索的位置数、每秒位置数、剪枝次数和每个位置的剪枝率
+    """
+    results = {}
+    for depth in depths:
+        boards = numMaps[:max(1, len(numMaps) >> max(0, depth - 2))]  # 深度每加一，局面数减半
+        for engine in ['minimax', 'expectimax']:
+            if engine == 'expectimax' and depth > EXPECTIMAX_MAX_DEPTH:
+                continue
+            samples = []
+            nodes = []
+            cutoffs = []
+            for numMap in boards:
+                board = Board(4, numMap)
+                start = time.perf_counter()
+                result = searchBestMove(board, depth, transTable(), engine=engine)
+                samples.append(time.perf_counter() - start)
+                nodes.append(result.positions)
+                cutoffs.append(result.cutoffs)
+            results['getBestMove.{}.depth{}'.format(
+                engine, depth)] = summary(samples, nodes, cutoffs)
+    return results
+
+
+def run(perStage=20, depths=(2, 3, 4, 5), searchBoards=5, repeat=3, seed=0):
+    """
+    运行全部测试
+    参数:
+        perStage:每个阶段的局面数
+        depths:getBestMove测试的深度
+        searchBoards:每个阶段用于getBestMove测试的局面数，深度2以上每加一层减半
+        repeat:快速函数的重复次数
+        seed:语料的随机种子
+    返回值:
+        可以直接写成JSON的结果字典
+    """
+    corpus = makeCorpus(perStage, seed)
+    results = {}
+    for stage, numMaps in corpus.items():
+        stageResults = benchStage(numMaps, repeat)
+        stageResults.update(benchSearch(numMaps[:searchBoards], depths))
+        for name, result in stageResults.items():
+            results[name + '/' + stage] = result
+    return {'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'seed': seed, 'perStage': perStage, 'depths': list(depths),
+                     'time': time.strftime('%Y-%m-%d %H:%M:%S')},
+            'results': results}
+
+
+def compare(old, new, threshold=0.1, key='p50_us'):
+    """
+    比较两次结果
+    参数:
+        old,new:run返回的结果字典
+        threshold:相对变化超过该比例才认为是退化或提升
+        key:比较的指标
+    返回值:
+        [(测试名, 旧值, 新值, 比值, 状态)]，状态为'regression'、'improvement'或'same'
+    """
+    rows = []
+    for name in sorted(set(old['results']) & set(new['results'])):
+        if key not in old['results'][name] or key not in new['results'][name]:
+            continue  # 只有搜索类的测试才有nodes等指标
+        oldValue = old['results'][name][key]
+        newValue = new['results'][name][key]
+        ratio = newValue / oldValue if oldValue > 0 else 1.0
+        if ratio > 1 + threshold:
+            state = 'regression'
+        elif ratio < 1 - threshold:
+            state = 'improvement'
+        else:
+            state = 'same'
+        rows.append((name, oldValue, newValue, ratio, state))
+    return rows
+
+
+def save(result, path):
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
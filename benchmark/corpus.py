@@ -0,0 +1,47 @@
+import random
+from game.map import BitMap, decode, transpose, emptyCount
+from game.search import searchMap
+
+# 棋盘语料的四个阶段，按最大数字和空格数划分
+STAGES = ['early', 'mid', 'late', 'nearOver']
+
+
+def stageOf(aiMap: BitMap):  # 判断局面所处的阶段
+    if emptyCount(aiMap.board) <= 1:
+        return 'nearOver'
+    maxTile = max(max(row) for row in aiMap.map)
+    if maxTile <= 64:
+        return 'early'
+    elif maxTile <= 256:
+        return 'mid'
+    return 'late'
+
+
+def makeCorpus(perStage=50, seed=0):
+    """
+    生成可复现的棋盘语料
+    功能:
+        用深度为0的AI按固定种子下棋，把经过的局面按阶段收集起来
+    参数:
+        perStage:每个阶段收集的局面数
+        seed:随机种子，相同种子得到相同的语料
+    返回值:
+        {阶段: [numMap, ...]}，numMap与Board.numMap()的方向一致
+    """
+    rng = random.Random(seed)
+    corpus = {stage: [] for stage in STAGES}
+    while any(len(boards) < perStage for boards in corpus.values()):
+        aiMap = BitMap(4, [[0] * 4 for i in range(4)])
+        for i in range(2):
+            [r, c] = rng.choice(aiMap.getAvailableCells())
+            aiMap.add_xy(r, c, 2)
+        while not aiMap.over():
+            stage = stageOf(aiMap)
+            if len(corpus[stage]) < perStage and rng.random() < 0.2:  # 抽样，避免同一局的局面过于集中
+                corpus[stage].append(decode(transpose(aiMap.board)))
+            move = searchMap(aiMap, 0, None).move
+            if move < 0 or not aiMap.move(move):
+                break
+            [r, c] = rng.choice(aiMap.getAvailableCells())
+            aiMap.add_xy(r, c, rng.choice([2, 2, 2, 2, 2, 2, 2, 2, 2, 4]))
+    return corpus
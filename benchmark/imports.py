@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 无界面使用的模块：导入时不能导入pygame，{模块: 导入时间上限(ms)}
+# game.map、game.val和game.search在导入时生成查找表，占了大部分时间
+HEADLESS_BUDGETS = {'board': 150,
+                    'game.map': 300,
+                    'game.replay': 300,
+                    'game.search': 900,
+                    'game.worker': 900,
+                    'game.ponder': 900,
+                    'game.tip2048': 1000}
+
+# 界面模块：可以导入pygame，但导入时不能初始化显示或打开窗口
+UI_BUDGETS = {'show.show': 400,
+              'game.base2048': 400,
+              'game.AI2048': 1200}
+
+SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+pygame = sys.modules.get('pygame')
+print(json.dumps({{'ms': elapsed * 1000, 'pygame': pygame is not None,
+                  'display': pygame is not None and bool(pygame.display.get_init())}}))
+'''
+
+
+def measureImport(module, repeat=3):
+    """
+    在新的解释器中测量一个模块的导入时间
+    参数:
+        module:模块名
+        repeat:测量次数，取最小值
+    返回值:
+        {'ms': 导入时间, 'pygame': 是否导入了pygame, 'display': 是否初始化了显示}
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', SNIPPET.format(module=module)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['ms'] < best['ms']:
+            best = result
+    return best
+
+
+def checkImports(repeat=3, scale=1.0):
+    """
+    检查导入时间和副作用
+    参数:
+        repeat:每个模块的测量次数
+        scale:时间上限的倍数，用于较慢的机器
+    返回值:
+        [(模块, 导入时间, 上限, 是否导入了pygame, 是否初始化了显示, 是否通过)]
+    """
+    rows = []
+    for budgets, headless in [(HEADLESS_BUDGETS, True), (UI_BUDGETS, False)]:
+        for module, budget in budgets.items():
+            result = measureImport(module, repeat)
+            ok = result['ms'] <= budget * scale and not result['display'] and not (
+                headless and result['pygame'])
+            rows.append((module, result['ms'], budget * scale,
+                         result['pygame'], result['display'], ok))
+    return rows
@@ -1,103 +1,124 @@
 import random
 import numpy as np
-from animate.animate import anime
+from animate.manager import manager
 
 
-# block类，主要为了更方便的实现动画，可以存储上一个位置和动画类型，从而方便生成动画
+# block类，只保存动画相关的信息：上一个位置、合并来源和动画类型，数字本身存放在Board.map中
+# 每个格子固定对应一个Block，移动时只修改其中的字段，不再重新创建
+# animate和anotherAnimate是动画管理器中的动画编号，每个编号只属于一个Block
 class Block:
-    def __init__(self, num, pos, animeType=0) -> None:
-        self.num = num
+    __slots__ = ('lastPos', 'anotherPos', 'animate',
+                 'anotherAnimate', 'animeType')
+
+    def __init__(self, pos, animeType=0) -> None:
+        self.reset(pos, animeType)
+
+    def reset(self, pos, animeType=0):  # 恢复为没有动画的状态，用于空格和新产生的数字
         self.lastPos = pos
         self.anotherPos = [-1, -1]
-        self.animate = anime((0, 0), (0, 0), 0)
-        self.anotherAnimate = anime((0, 0), (0, 0), 0)
+        self.animate = None
+        self.anotherAnimate = None
         self.animeType = animeType
 
-    def addAnimate(self, startPos, endPos, totalTime, function=None):  # 添加动画，使用动画类进行操作
-        if self.animate.startPos == startPos and self.animate.endPos == endPos:
+    def release(self):  # 把动画编号还给动画管理器，用于块被删除或合并消失
+        manager.free(self.animate)
+        manager.free(self.anotherAnimate)
+        self.animate = None
+        self.anotherAnimate = None
+
+    def addAnimate(self, startPos, endPos, totalTime, function=None):  # 添加动画，使用动画管理器进行操作
+        if self.animate is not None and manager.same(self.animate, startPos, endPos):
             return
         else:
-            if function == None:
-                self.animate = anime(startPos, endPos, totalTime)
-            else:
-                self.animate = anime(startPos, endPos, totalTime, function)
+            manager.free(self.animate)
+            self.animate = manager.add(startPos, endPos, totalTime, function)
 
     # 如果是合并类型，则需要给已经消失的块也添加一个动画
     def addAnotherAnimate(self, startPos, endPos, totalTime, function=None):
-        if self.anotherAnimate.startPos == startPos and self.anotherAnimate.endPos == endPos:
+        if self.anotherAnimate is not None and manager.same(self.anotherAnimate, startPos, endPos):
             return
         else:
-            if function == None:
-                self.anotherAnimate = anime(startPos, endPos, totalTime)
-            else:
-                self.anotherAnimate = anime(
-                    startPos, endPos, totalTime, function)
+            manager.free(self.anotherAnimate)
+            self.anotherAnimate = manager.add(
+                startPos, endPos, totalTime, function)
 
 # TODO 将Broad改为任意矩形，将lineProcess归入Broad类
 
 
-# 处理一行，这里的处理方式可能不是最优，但是对于实现动画是最方便的
+# 处理一行数字，返回新的一行、每个位置的数字来自原来哪些位置（合并时有两个）以及得分
 def lineProcess(line):
-    i = 0
+    new = []
+    sources = []
     score = 0
-    changed = False
-    for i in range(len(line)):  # 将0聚集在尾部
-        if(line[i].num == 0):
-            k = i
-            for j in range(i+1, len(line)):
-                if(line[j].num != 0):
-                    line[k] = line[j]
-                    line[k].animeType = 1
-                    changed = True
-                    line[j] = Block(0, line[j].lastPos)
-                    k += 1
-            break
-    for i in range(len(line)-1):  # 只需要到len-1即可，最后一位是不会合并的
-        if line[i].num == 0:   # 已经将0转移至尾，如果扫到0则证明已经结束
-            break
+    for i in range(len(line)):
+        if line[i] == 0:
+            continue
+        if len(new) > 0 and new[-1] == line[i] and len(sources[-1]) == 1:  # 与前一个相同且前一个没有合并过
+            new[-1] *= 2
+            sources[-1].append(i)
+            score += new[-1]
         else:
-            if line[i].num == line[i+1].num:  # 如果相同则合并
-                line[i+1].anotherPos = line[i].lastPos
-                line[i] = line[i+1]
-                line[i].animeType = 2
-                line[i].num *= 2
-                score += line[i].num
-                changed = True
-                k = i+1
-                for j in range(i+2, len(line)):  # 合并后将后面数据前移
-                    if(line[j].num != 0):
-                        line[k] = line[j]
-                        line[k].animeType = 1
-                        line[j] = Block(0, line[j].lastPos)
-                        k += 1
-                if k == i+1:
-                    line[i+1] = Block(0, line[i+1].lastPos)
-    return line, changed, score
+            new.append(line[i])
+            sources.append([i])
+    new += [0] * (len(line) - len(new))
+    return new, sources, score
+
+
+# 四个方向上需要处理的各行的坐标，每一行按移动方向从前往后排列
+def moveLines(size, dir):
+    if dir == 0:  # 上
+        return [[(i, j) for j in range(size)] for i in range(size)]
+    elif dir == 1:  # 下
+        return [[(i, j) for j in reversed(range(size))] for i in range(size)]
+    elif dir == 2:  # 左
+        return [[(j, i) for j in range(size)] for i in range(size)]
+    elif dir == 3:  # 右
+        return [[(j, i) for j in reversed(range(size))] for i in range(size)]
 
 
 # board类，用于对棋盘进行各种处理，移动，添加，删除等，并添加了一些方便操作的函数
+# map为整数数组，存放每个格子的数字；blocks为对应的Block，存放动画信息
 class Board:
-    def __init__(self, size, map=None, score=0):
+    def __init__(self, size, map=None, score=0, seed=None):
         self.size = size
         self.score = score
         self.debug = False
         self.changed = False
-        self.map = np.array([[Block(0, [i, j])
-                              for i in range(size)] for j in range(size)], dtype=Block)
+        self.lines = [moveLines(size, dir) for dir in range(4)]
+        if hasattr(self, 'blocks'):  # 重新初始化时释放原来的动画
+            for column in self.blocks:
+                for block in column:
+                    block.release()
+        if not hasattr(self, 'replay'):
+            self.replay = None  # 录像，为replayWriter时记录每一局，New重新初始化时保留
+        if seed is None and self.replay is not None:
+            seed = random.randrange(1 << 63)  # 录像的每一局都有种子，按种子可以重现放置的数字
+        self.seed = seed
+        self.random = random if seed is None else random.Random(seed)
+        self.lastMove = -1  # 上一次改变了棋盘的移动方向，放置数字后清除，用于录像
+        self.map = np.zeros((size, size), dtype=np.int64)
+        self.blocks = [[Block([i, j]) for j in range(size)]
+                       for i in range(size)]
         self.add()  # 随机产生第一个随机数
         self.add()  # 随机产生第二个随机数
         if isinstance(map, list) or isinstance(map, np.ndarray):
             for i in range(size):
                 for j in range(size):
-                    self.map[i][j] = Block(map[i][j].num, [i, j])
+                    self.map[i][j] = map[i][j]
+                    self.blocks[i][j].reset([i, j])
+        if self.replay is not None:
+            self.replay.start(self.seed, self.map)
 
     def numMap(self):
-        return [[self.map[i, j].num for j in range(self.size)] for i in range(self.size)]
+        return self.map.tolist()
+
+    def key(self):  # 局面的键，数字相同的局面键相同，用于判断搜索结果是否过期
+        return self.map.tobytes()
 
     def mapPrint(self):
         for j in range(self.size):
             for i in range(self.size):  # 因为是先行后列，所以i放在后面
-                print(self.map[i][j].num, end=' || ')
+                print(self.map[i][j], end=' || ')
             print()
         print()
 
@@ -107,156 +128,102 @@ class Board:
             return True
         return False
 
-    # 新增2或4，有1/4概率产生4
+    # 新增2或4，有1/10概率产生4
     def add(self):
         if self.debug:
             print(self.numMap())
-        tempList = []
-        # 判断数值矩阵中是否有零
-        for r in range(self.size):
-            for c in range(self.size):
-                if self.map[r][c].num == 0:
-                    tempList.append([r, c])
-
+        tempList = self.getAvailableCells()
         if len(tempList) > 0:
-            [r, c] = random.choice(tempList)
-            x = random.choice([2, 2, 2, 2, 2, 2, 2, 2, 2, 4])  # 随机产生一个 2 或 4
-            self.map[r][c] = Block(x, [r, c], 3)  # 设置该坐标为随机值
+            [r, c] = self.random.choice(tempList)
+            x = self.random.choice([2, 2, 2, 2, 2, 2, 2, 2, 2, 4])  # 随机产生一个 2 或 4
+            self.map[r][c] = x  # 设置该坐标为随机值
+            self.blocks[r][c].reset([r, c], 3)
+            if self.replay is not None and self.lastMove >= 0:  # 移动和之后放置的数字记为一步
+                self.replay.step(self.lastMove, r, c, x)
+            self.lastMove = -1
             return True
         else:
             return False
 
     def add_xy(self, x, y, val):  # 在指定位置放置指定数字，用于AI
-        if self.map[x][y].num == 0:
-            self.map[x][y] = Block(val, [x, y], 3)
+        if self.map[x][y] == 0:
+            self.map[x][y] = val
+            self.blocks[x][y].reset([x, y], 3)
             return True
         else:
             return False
 
     def remove_xy(self, x, y):  # 删除指定位置的数字，用于AI
-        self.map[x][y] = Block(0, [x, y])
+        self.map[x][y] = 0
+        self.blocks[x][y].release()
+        self.blocks[x][y].reset([x, y])
 
     def move(self, dir):
-        if dir == 0:
-            return self.move_up()
-        elif dir == 1:
-            return self.move_down()
-        elif dir == 2:
-            return self.move_left()
-        elif dir == 3:
-            return self.move_right()
-
-    # 向上计算
-    def move_up(self):
         self.changed = False
-        newLines = []
         thisScore = 0
-        for i in range(self.size):
-            tempLine, tempChanged, tempScore = lineProcess(
-                self.map[i, :])  # 将map拆分成line进行处理
+        for cells in self.lines[dir]:  # 将map拆分成line进行处理
+            line = [int(self.map[x, y]) for x, y in cells]
+            newLine, sources, tempScore = lineProcess(line)
+            if newLine == line:
+                continue
+            self.changed = True
             thisScore += tempScore
-            newLines.append(tempLine)
-            self.changed = self.changed or tempChanged
+            blocks = [self.blocks[x][y] for x, y in cells]
+            olds = [(block.lastPos, block.animate, block.anotherAnimate, block.animeType)
+                    for block in blocks]  # 先记下原来的动画信息，再原地改写
+            for k in range(len(cells)):
+                x, y = cells[k]
+                self.map[x, y] = newLine[k]
+                block = blocks[k]
+                if k >= len(sources):  # 移走后空出来的格子
+                    block.reset([x, y])
+                    continue
+                source = sources[k][-1]  # 合并时保留后一个块，前一个块作为anotherPos
+                block.lastPos, block.animate, block.anotherAnimate, block.animeType = olds[source]
+                if len(sources[k]) == 2:
+                    block.anotherPos = olds[sources[k][0]][0]
+                    manager.free(olds[sources[k][0]][1])  # 合并消失的块不再需要原来的动画
+                    manager.free(olds[sources[k][0]][2])
+                    block.animeType = 2
+                elif source != k:
+                    block.animeType = 1
         self.score += thisScore
-        if self.changed:  # 发生改变
-            newMap = np.vstack((newLines[0], newLines[1]))
-            for i in range(2, len(newLines)):
-                newMap = np.vstack((newMap, newLines[i]))
-            self.map = newMap
+        self.lastMove = dir if self.changed else -1
         if self.debug:
             self.mapPrint()
         return self, self.changed, thisScore
 
+    # 向上计算
+    def move_up(self):
+        return self.move(0)
+
     # 向下计算
     def move_down(self):
-        self.changed = False
-        newLines = []
-        thisScore = 0
-        for i in range(self.size):
-            tempLine, tempChanged, tempScore = lineProcess(
-                self.map[i, ::-1])  # 将map拆分成line进行处理
-            thisScore += tempScore
-            newLines.append(tempLine)
-            self.changed = self.changed or tempChanged
-        self.score += thisScore
-        if self.changed:  # 发生改变
-            newMap = np.vstack((newLines[0][::-1], newLines[1][::-1]))
-            for i in range(2, len(newLines)):
-                newMap = np.vstack((newMap, newLines[i][::-1]))
-            self.map = newMap
-        if self.debug:
-            self.mapPrint()
-        return self, self.changed, thisScore
+        return self.move(1)
 
     # 向左计算
     def move_left(self):
-        self.changed = False
-        newLines = []
-        thisScore = 0
-        for i in range(self.size):
-            tempLine, tempChanged, tempScore = lineProcess(
-                self.map[:, i])  # 将map拆分成line进行处理
-            thisScore += tempScore
-            newLines.append(tempLine)
-            self.changed = self.changed or tempChanged
-        self.score += thisScore
-        if self.changed:  # 发生改变
-            newMap = np.hstack(
-                (np.transpose([newLines[0]]), np.transpose([newLines[1]])))
-            for i in range(2, len(newLines)):
-                newMap = np.hstack((newMap, np.transpose([newLines[i]])))
-            self.map = newMap
-        if self.debug:
-            self.mapPrint()
-        return self, self.changed, thisScore
+        return self.move(2)
 
     # 向右计算
     def move_right(self):
-        self.changed = False
-        newLines = []
-        thisScore = 0
-        for i in range(self.size):
-            tempLine, tempChanged, tempScore = lineProcess(
-                self.map[::-1, i])  # 将map拆分成line进行处理
-            thisScore += tempScore
-            newLines.append(tempLine)
-            self.changed = self.changed or tempChanged
-        self.score += thisScore
-        if self.changed:  # 发生改变
-            newMap = np.hstack(
-                (np.transpose([newLines[0][::-1]]), np.transpose([newLines[1][::-1]])))
-            for i in range(2, len(newLines)):
-                newMap = np.hstack((newMap, np.transpose([newLines[i][::-1]])))
-            self.map = newMap
-        if self.debug:
-            self.mapPrint()
-        return self, self.changed, thisScore
+        return self.move(3)
 
     # 判断游戏结束
     def over(self):
         # 判断数值矩阵中是否有零
-        for r in range(self.size):
-            for c in range(self.size):
-                if self.map[r][c].num == 0:
-                    return False
-        # 判断是否可以左右相消
-        for r in range(self.size):
-            for c in range(self.size - 1):
-                if self.map[r][c].num == self.map[r][c + 1].num:
-                    return False
-        # 判断是否可以上下相消
-        for r in range(self.size - 1):
-            for c in range(self.size):
-                if self.map[r][c].num == self.map[r + 1][c].num:
-                    return False
+        if (self.map == 0).any():
+            return False
+        # 判断是否可以左右、上下相消
+        if (self.map[:, 1:] == self.map[:, :-1]).any() or (self.map[1:, :] == self.map[:-1, :]).any():
+            return False
         # print("游戏结束")
         return True
 
     def getAvailableCells(self):  # 返回所有的可以放数字的位置
         AvCells = []
-        numMap = self.numMap()
         for i in range(self.size):
             for j in range(self.size):
-                if numMap[i][j] == 0:
+                if self.map[i][j] == 0:
                     AvCells.append([i, j])
         return AvCells
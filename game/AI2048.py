@@ -6,135 +6,71 @@ from pygame.locals import *
 from show.show import *
 import time
 from sound.sound import *
-from game.map import AIMap
+from game.search import *
+from game.worker import searchWorker
+from game.ponder import ponderer
 
 search_step = 3
 size_x = size_y = SIZE = 4
 
 
-# 定义搜索结果类，用于方便处理返回值
-class searchResult:
-    def __init__(self, move=-1, score=0, positions=0, cutoffs=0) -> None:
-        self.move = move
-        self.positions = positions
-        self.cutoffs = cutoffs
-        self.score = score
-
-
 # 四个方向向量，方便遍历时使用
 vectors = [[0, 1], [1, 0], [-1, 0], [0, -1]]
 
-#
-def search(thisBoard: AIMap, depth, alpha, beta, positions, cutoffs, plyaerTurn: bool) -> searchResult:
+
+lastTime = int(time.time()*1000)
+
+aiStats = None  # AI模式的搜索统计，为None时不统计
+aiWorker = searchWorker()  # AI模式的后台搜索
+aiPonder = None  # AI模式的预搜索，为None时不预搜索，用enablePonder打开
+aiNext = None  # (局面的键, searchResult)，已经得到但还没有执行的一步
+aiSoundGap = 150  # AI模式滑动音效的最小间隔(ms)，gap较小时不再每一步都播放；静音使用sounds.mute()
+
+
+def printStats(stats: searchStats, result: searchResult):  # 默认的统计回调，每一步打印一行摘要
+    print('move {} depth {} {}'.format(result.move, result.depth, stats.report()))
+
+
+def enableStats(callback=printStats, profile=None):
     """
-    搜索最优移动方向
-    功能:
-        使用minmax搜索，并使用alpha，beta剪枝减少搜索次数
+    打开AI模式的搜索统计
     参数:
-        board:实例board界面
-        depth:搜索深度
-        alpha,beta:剪枝所需的参数
-        positions,cutoffs:用于记录位置与剪枝次数
+        callback:每一步搜索完成后调用callback(stats, result)
+        profile:cProfile结果的保存路径，为None时不使用cProfile
     返回值:
-        searchResult:包含各种参数,详见searchResult类
+        searchStats对象，其中保存最近一步的统计
     """
-    bestScore = 0
-    bestMove = -1
-    result = searchResult()
-
-    if plyaerTurn:  # max轮
-        bestScore = alpha  # 最高分为alpha
-        for direction in range(4):  # 四个方向分别进行遍历
-            newBoard = AIMap(4, thisBoard.map)  # 新建一个棋盘防止影响到正式游戏
-            changed = newBoard.move(direction)  # 相对应方向移动
-            if changed:  # 如果这个方向可以移动
-                positions += 1  # positions自增
-                if depth == 0:  # 如果已经搜索到最底层了
-                    result.move = direction
-                    result.score = sum(val.evaluation(
-                        newBoard.map))  # 返回当前局面的评价值
-                else:  # 没有到达最深
-                    result = search(
-                        newBoard, depth-1, bestScore, beta, positions, cutoffs, False)  # 进行min轮，即让AI下出对局面最不利的一步
-                    if result.score > 9900:  # 如果得分已经很高则适当减少
-                        result.score -= 1
-                    positions = result.positions
-                    cutoffs = result.cutoffs  # 将返回值进行处理
-
-                if result.score > bestScore:
-                    bestScore = result.score
-                    bestMove = direction
-                if bestScore > beta:  # 如果最高值大于beta，则已经证明该走法优于前面的最优，则本深度下后面不用继续计算。
-                    cutoffs += 1
-                    return searchResult(bestMove, beta, positions, cutoffs)
-    else:  # min轮，让AI走出最差一步
-        bestScore = beta
-        newBoard = AIMap(4, thisBoard.map)
-        score_2 = []
-        score_4 = []
-        worstSituation = []
-        cells = newBoard.getAvailableCells()
-        for value in [2, 4]:  # 生成可能的所有情况，并进行评估
-            for i in range(len(cells)):
-                if not newBoard.add_xy(cells[i][0], cells[i][1], value):
-                    print("!!!!")
-                    input()
-                if value == 2:
-                    score_2.append(-val.smothness(newBoard.map) +
-                                   newBoard.islands())
-                if value == 4:
-                    score_4.append(-val.smothness(newBoard.map) +
-                                   newBoard.islands())
-                newBoard.remove_xy(cells[i][0], cells[i][1])
-
-        maxScore = max(max(score_2), max(score_4))  # 找到最差的情况
-        for i in range(len(score_2)):  # 最差的情况可能不止一种，所以遍历一遍防止遗漏
-            if score_2[i] == maxScore:
-                worstSituation.append([cells[i], 2])
-        for i in range(len(score_4)):
-            if score_4[i] == maxScore:
-                worstSituation.append([cells[i], 4])
-        for situation in worstSituation:  # 遍历所有最差情况
-            nnewBoard = AIMap(4, thisBoard.map)
-            # input()
-            if not nnewBoard.add_xy(situation[0][0], situation[0][1], situation[1]):
-                print('nnewBoard.map', nnewBoard.map)
-                print('newBoard.map', newBoard.map)
-                print(situation)
-                input()
-            positions += 1
-            result = search(nnewBoard, depth, alpha,
-                            bestScore, positions, cutoffs, True)  # 进一步搜索
-            positions = result.positions
-            cutoffs = result.cutoffs
-
-            if result.score < bestScore:
-                bestScore = result.score
-
-            if bestScore < alpha:  # 剪枝同理
-                cutoffs += 1
-                return searchResult(-1, alpha, positions, cutoffs)
-
-    return searchResult(bestMove, bestScore, positions, cutoffs)
-
-
-def getBestMove(board: Board, depth=4):
+    global aiStats
+    aiStats = searchStats(callback, profile)
+    return aiStats
+
+
+def disableStats():
+    global aiStats
+    aiStats = None
+
+
+def enablePonder(**kwargs):
     """
-    搜索最优移动方向
+    打开AI模式的预搜索
     功能:
-        调用search,并给出参数
+        在等待gap的时间里搜索下一步之后可能出现的局面；gap较小时命中率很低，默认不打开
     参数:
-        board:实例board界面
-        depth:搜索深度
+        kwargs:传给ponderer的参数
     返回值:
-        最佳动作
+        ponderer对象，命中情况见其cache
     """
-    nAIMap = AIMap(4, board.numMap())
-    newBest = search(nAIMap, depth, -1000000, 1000000, 0, 0, True)
-    return newBest.move
+    global aiPonder
+    disablePonder()
+    aiPonder = ponderer(**kwargs)
+    return aiPonder
 
 
-lastTime = int(time.time()*1000)
+def disablePonder():
+    global aiPonder
+    if aiPonder is not None:
+        aiPonder.stop()
+    aiPonder = None
 
 
 def AI_2048(board: Board, button, gap=50):
@@ -149,43 +85,68 @@ def AI_2048(board: Board, button, gap=50):
     返回值:
         GameState:默认为False，当判断New按键操作时为True重置board
     """
-    global lastTime
+    global lastTime, aiNext
     GameState = False
-    if int(time.time()*1000) - lastTime > gap:
+    if aiNext is None and not aiWorker.searching(board):  # 局面变化后先查预搜索的结果
+        result = aiPonder.lookup(board) if aiPonder is not None else None
+        if result is not None:
+            aiNext = (board.key(), result)
+            aiPonder.start(board, result.move, budget=gap)
+        else:  # 没有命中时停止预搜索，立即在后台开始搜索，搜索时间不超过gap
+            if aiPonder is not None:
+                aiPonder.stop()
+            aiWorker.submit(board, budget=gap, stats=aiStats)
+    if aiNext is None:
+        result = aiWorker.poll(board)  # 只取已经完成的结果，没有完成时本帧照常显示
+        if result is not None:
+            aiNext = (board.key(), result)
+            if aiPonder is not None:
+                aiPonder.start(board, result.move, budget=gap)  # 等待gap期间预搜索这一步之后的局面
+    result = None
+    if aiNext is not None and int(time.time()*1000) - lastTime > gap:
+        if aiNext[0] == board.key():
+            result = aiNext[1]
+        aiNext = None
+    if result is not None:
         lastTime = int(time.time()*1000)
 
-        now = board
-        operation = getBestMove(now)  # 调用AI算法
+        operation = result.move
         print(operation)
         if operation == 0:
             board.move_up()
-            slideSound()
+            slideSound(aiSoundGap)
             if(board.changed):
                 board.add()  # 添加一个新数
         elif operation == 1:
             board.move_down()
-            slideSound()
+            slideSound(aiSoundGap)
             if(board.changed):
                 board.add()  # 添加一个新数
         elif operation == 2:
             board.move_left()
-            slideSound()
+            slideSound(aiSoundGap)
             if(board.changed):
                 board.add()  # 添加一个新数
         elif operation == 3:
             board.move_right()
-            slideSound()
+            slideSound(aiSoundGap)
             if(board.changed):
                 board.add()  # 添加一个新数
                 
     # 按键事件判断 #
     for event in pygame.event.get():
+        checkExpose(event)  # 窗口重新显示时整屏重画
         if event.type == pygame.QUIT:
             pygame.quit()  # 直接退出
         button[0].check_event(event)
         button[1].check_event(event)
         button[2].check_event(event)
         GameState = button[3].check_event(event)
+    if GameState:  # New之后棋盘已经重置，丢弃正在进行的搜索
+        aiWorker.cancel()
+        if aiPonder is not None:
+            aiPonder.stop()
+        aiNext = None
 
     return GameState
 
@@ -21,6 +21,7 @@ def start_base_2048(board: Board, button, extip):
     GameState = False
     tip = extip
     for event in pygame.event.get():
+        checkExpose(event)  # 窗口重新显示时整屏重画
         if event.type == QUIT:
             pygame.quit()  # 直接退出
         # 接收玩家操作
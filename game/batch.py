@@ -0,0 +1,110 @@
+import numpy as np
+from game.map import rowLeftTable, rowRightTable, rowLeftScore, rowRightScore, bitMove, decode, BitMap
+import game.val as val
+
+# 批量处理：棋盘为(N,4,4)的uint8数组，元素为数字的指数（0为空），第二维为行、第三维为列，与AIMap.map一致
+# 移动同样通过65536种行的查表完成，表直接取自game.map和game.val
+
+rowLeft = np.array(rowLeftTable, dtype=np.uint16)
+rowRight = np.array(rowRightTable, dtype=np.uint16)
+scoreLeft = np.array(rowLeftScore, dtype=np.int64)
+scoreRight = np.array(rowRightScore, dtype=np.int64)
+lineSmooth = np.array(val.lineSmooth)
+lineMonoDown = np.array(val.lineMonoDown)
+lineMonoUp = np.array(val.lineMonoUp)
+lineEmpty = np.array(val.lineEmpty)
+lineMax = np.array(val.lineMax)
+shifts = np.array([0, 4, 8, 12], dtype=np.uint16)
+
+
+def packRows(boards):  # (N,4,4)指数数组 -> (N,4)的16位行编号
+    return (boards.astype(np.uint16) << shifts).sum(axis=-1, dtype=np.uint16)
+
+
+def unpackRows(rows):  # (N,4)的16位行编号 -> (N,4,4)指数数组
+    return ((rows[..., None] >> shifts) & 0xF).astype(np.uint8)
+
+
+def _moveRows(boards, table, scoreTable):
+    rows = packRows(boards)
+    return unpackRows(table[rows]), scoreTable[rows].sum(axis=-1)
+
+
+def batchMove(boards):
+    """
+    批量计算四个方向的移动
+    参数:
+        boards:(N,4,4)的uint8指数数组
+    返回值:
+        successors:(4,N,4,4)，四个方向移动后的棋盘，方向与AIMap.move一致，0左 1右 2上 3下
+        scores:(4,N)，每个方向本次移动的得分
+        changed:(4,N)，每个方向是否发生了移动
+        over:(N,)，游戏是否结束，与Board.over一致
+    """
+    boards = np.asarray(boards, dtype=np.uint8)
+    cols = boards.transpose(0, 2, 1)  # 上下移动通过转置后左右移动实现
+    left, leftScore = _moveRows(boards, rowLeft, scoreLeft)
+    right, rightScore = _moveRows(boards, rowRight, scoreRight)
+    up, upScore = _moveRows(cols, rowLeft, scoreLeft)
+    down, downScore = _moveRows(cols, rowRight, scoreRight)
+    successors = np.stack(
+        [left, right, up.transpose(0, 2, 1), down.transpose(0, 2, 1)])
+    scores = np.stack([leftScore, rightScore, upScore, downScore])
+    changed = (successors != boards).any(axis=(2, 3))
+    over = ~changed.any(axis=0)  # 四个方向都动不了即结束，有空格时一定能移动
+    return successors, scores, changed, over
+
+
+def batchTerms(boards, score=0):
+    """
+    批量计算评价函数的各项，顺序与val.evaluation的返回值相同
+    没有空格的棋盘empty项为-inf，与val.evaluation中log(0)的情况对应
+    """
+    boards = np.asarray(boards, dtype=np.uint8)
+    rows = packRows(boards)
+    cols = packRows(boards.transpose(0, 2, 1))
+    smooth = lineSmooth[rows].sum(axis=-1) + lineSmooth[cols].sum(axis=-1)
+    mono = (np.maximum(lineMonoDown[rows].sum(axis=-1), lineMonoUp[rows].sum(axis=-1)) +
+            np.maximum(lineMonoDown[cols].sum(axis=-1), lineMonoUp[cols].sum(axis=-1)))
+    with np.errstate(divide='ignore'):
+        empty = np.log(lineEmpty[rows].sum(axis=-1))
+    maxValue = lineMax[rows].max(axis=-1)
+    if val.disWeight != 0:
+        logs = np.where(boards > 0, boards, 0)  # 指数即log2(数值)
+        dis = (logs * np.array(val.wei)).sum(axis=(1, 2))
+    else:
+        dis = np.zeros(len(boards))
+    return [val.disWeight*dis, val.smoothWeight*smooth, val.mono2Weight*mono,
+            val.emptyWeight*empty, val.maxWeight*maxValue, val.scoreWeight*np.asarray(score)]
+
+
+def batchEvaluation(boards, score=0):  # 批量计算评价值，与sum(val.evaluation(map))相同
+    return sum(batchTerms(boards, score))
+
+
+def randomBoards(n, seed=None, maxExponent=11):  # 生成n个随机棋盘，用于测试和调参
+    rng = np.random.default_rng(seed)
+    boards = rng.integers(0, maxExponent + 1, size=(n, 4, 4), dtype=np.uint8)
+    boards[rng.random((n, 4, 4)) < 0.3] = 0
+    return boards
+
+
+def testBatch(times=3000, seed=0):  # 随机棋盘上检查批量移动、结束判断和评价与逐个计算的结果相同
+    boards = randomBoards(times, seed)
+    successors, scores, changed, over = batchMove(boards)
+    values = batchEvaluation(boards)
+    for n in range(times):
+        board = 0
+        for r in range(4):
+            for c in range(4):
+                board |= int(boards[n, r, c]) << (4 * (4 * r + c))
+        for dir in range(4):
+            newBoard, score = bitMove(board, dir)
+            expected = [[(newBoard >> (4 * (4 * r + c))) & 0xF for c in range(4)] for r in range(4)]
+            assert successors[dir, n].tolist() == expected, (n, dir)
+            assert score == scores[dir, n] and (newBoard != board) == changed[dir, n], (n, dir)
+        assert over[n] == BitMap(4, board=board).over(), n
+        if (boards[n] == 0).any():  # 没有空格时原评价函数的log(0)无意义
+            assert abs(values[n] - sum(val.evaluation(decode(board)))) < 1e-9, n
+    return True
+
@@ -0,0 +1,112 @@
+import time
+import game.val as val
+from game.map import bitMove
+from game.search import searchResult, searchTimeout
+
+# 新数字的指数及生成概率，与Board.add一致，9/10为2，1/10为4
+spawnProbs = [(1, 0.9), (2, 0.1)]
+deadScore = -10000  # 无路可走时的评价值
+
+
+def evaluate(board):  # 位棋盘的评价值，与minmax使用同一套评价函数
+    return val.tableEvaluation(board)
+
+
+class expectimaxEngine:
+    """
+    expectimax搜索
+    功能:
+        max轮选择评价最高的方向，随机轮按真实的生成概率对所有空位的2和4求期望
+        累计概率低于threshold的随机分支不再展开，直接使用评价值
+        随机轮的结果按(棋盘, 深度)缓存，同一局面只计算一次
+    参数:
+        threshold:随机分支的累计概率阈值
+        deadline:截止时间（time.time()），超时抛出searchTimeout
+        stats:searchStats，为None时不做统计
+    """
+
+    def __init__(self, threshold=0.0001, deadline=None, stats=None):
+        self.threshold = threshold
+        self.deadline = deadline
+        self.stats = stats
+        self.cache = {}
+        self.positions = 0
+        self.cutoffs = 0  # 因概率过低被剪掉的随机分支数
+        self.hits = 0  # 随机轮缓存命中次数
+        self.misses = 0
+
+    def search(self, board, depth):
+        """
+        搜索最优移动方向
+        参数:
+            board:位棋盘整数，方向与BitMap.move一致
+            depth:搜索深度，与minmax的depth含义相同
+        返回值:
+            searchResult:包含最佳动作和各种统计
+        """
+        score, move = self.maxNode(board, depth, 1.0)
+        return searchResult(move, score, self.positions, self.cutoffs, self.hits, self.misses, depth)
+
+    def maxNode(self, board, depth, prob):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise searchTimeout()
+        stats = self.stats
+        if stats is not None:
+            stats.node(depth, True)
+        bestScore = deadScore
+        bestMove = -1
+        children = 0
+        for direction in range(4):
+            if stats is not None:
+                startTime = time.perf_counter()
+            newBoard = bitMove(board, direction)[0]
+            if stats is not None:
+                stats.moveTime += time.perf_counter() - startTime
+            if newBoard != board:  # 如果这个方向可以移动
+                self.positions += 1
+                children += 1
+                if depth == 0:
+                    if stats is not None:
+                        startTime = time.perf_counter()
+                    score = evaluate(newBoard)
+                    if stats is not None:
+                        stats.evalTime += time.perf_counter() - startTime
+                else:
+                    score = self.chanceNode(newBoard, depth - 1, prob)
+                if score > bestScore:
+                    bestScore = score
+                    bestMove = direction
+        if stats is not None:
+            stats.expand(children)
+        return bestScore, bestMove
+
+    def chanceNode(self, board, depth, prob):
+        stats = self.stats
+        if stats is not None:
+            stats.node(depth + 1, False)  # 与minmax一致，随机轮与其父节点的max轮在同一深度
+        if prob < self.threshold:  # 出现概率太低，不再展开
+            self.cutoffs += 1
+            if stats is not None:
+                stats.cutoff(depth + 1, False)
+                startTime = time.perf_counter()
+            score = evaluate(board)
+            if stats is not None:
+                stats.evalTime += time.perf_counter() - startTime
+            return score
+        key = (board, depth)
+        if key in self.cache:
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        cells = [shift for shift in range(0, 64, 4)
+                 if (board >> shift) & 0xF == 0]
+        if stats is not None:
+            stats.expand(2 * len(cells))
+        total = 0
+        for shift in cells:
+            for exponent, p in spawnProbs:
+                total += p * self.maxNode(board | (exponent << shift),
+                                          depth, prob * p / len(cells))[0]
+        total /= len(cells)
+        self.cache[key] = total
+        return total
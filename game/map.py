@@ -1,8 +1,10 @@
 import random
+import threading
 from typing import List
 
-# 四个方向向量，方便遍历时使用
-vectors = [[0, 1], [1, 0], [-1, 0], [0, -1]]
+
+def islands(map):  # 计算分散度，越分散得分越高，即相邻且相等的数字组成的连通块个数
+    return bitIslands(encode(map))
 
 
 class AIMap:
@@ -12,31 +14,12 @@ class AIMap:
         self.map = [[0 for i in range(size)] for i in range(size)]
         self.add()  # 随机产生第一个随机数
         self.add()  # 随机产生第二个随机数
-        self.marked = []
         if isinstance(numMap, list):
             self.map = [[numMap[i][j]
                          for i in range(size)] for j in range(size)]
 
     def islands(self):  # 计算分散度，越分散得分越高
-        islandsMark = 0
-        self.marked = [[True]*4]*4
-        for i in range(4):
-            for j in range(4):
-                if self.map[i][j] != 0:
-                    self.marked[i][j] = False
-        for i in range(4):
-            for j in range(4):
-                if self.map[i][j] != 0 and not self.marked[i][j]:
-                    islandsMark += 1
-                    self.mark(i, j, self.map[i][j])
-        return islandsMark
-
-    def mark(self, x, y, value):
-        if x >= 0 and x <= 3 and y >= 0 and y <= 3 and self.map[x][y] != 0 and self.map[x][y] == value and not self.marked[x][y]:
-            self.marked[x][y] = True
-            for direction in range(4):
-                vector = vectors[direction]
-                self.mark(x+vector[0], y+vector[1], value)
+        return islands(self.map)
 
     def move(self, dir): # 为了配合，所以这里是乱的
         if dir == 0:
@@ -211,3 +194,285 @@ class AIMap:
                     return False
         # print("游戏结束")
         return True
+
+
+# 位棋盘（bitboard）实现
+# 每个格子用4位存储数字的指数（0为空，k表示2^k），16个格子正好放入一个64位整数
+# 第r行第c列的格子位于第 4*(4*r+c) 位，即每一行占16位，行内低位在左
+ROW_MASK = 0xFFFF
+
+
+def _lineLeft(line):  # 将一行（指数列表）向左合并，返回新行和得分，与AIMap.move_left逻辑相同
+    new = []
+    score = 0
+    bottom = 0
+    for e in line:
+        if e == 0:
+            continue
+        if bottom == e and e < 15:  # 4位最多表示到2^15，再合并会溢出
+            new[-1] += 1
+            score += 1 << new[-1]
+            bottom = 0
+        else:
+            bottom = e
+            new.append(e)
+    new += [0] * (4 - len(new))
+    return new, score
+
+
+def _buildRowTables():  # 预计算所有65536种行的左右移动结果和得分，导入时执行一次
+    left = [0] * 65536
+    leftScore = [0] * 65536
+    right = [0] * 65536
+    rightScore = [0] * 65536
+    for row in range(65536):
+        line = [(row >> (4 * i)) & 0xF for i in range(4)]
+        new, score = _lineLeft(line)
+        left[row] = new[0] | (new[1] << 4) | (new[2] << 8) | (new[3] << 12)
+        leftScore[row] = score
+    for row in range(65536):  # 向右等价于把行翻转后向左
+        rev = reverseRow(row)
+        right[row] = reverseRow(left[rev])
+        rightScore[row] = leftScore[rev]
+    return left, leftScore, right, rightScore
+
+
+def reverseRow(row):  # 翻转一行的4个格子
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def transpose(board):  # 转置位棋盘，行变列
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def mirror(board):  # 左右镜像，每一行内翻转
+    board = ((board & 0x0F0F0F0F0F0F0F0F) << 4) | (
+        (board >> 4) & 0x0F0F0F0F0F0F0F0F)
+    return ((board & 0x00FF00FF00FF00FF) << 8) | ((board >> 8) & 0x00FF00FF00FF00FF)
+
+
+def flip(board):  # 上下翻转，行的顺序翻转
+    return ((board & 0xFFFF) << 48) | ((board & 0xFFFF0000) << 16) | ((board >> 16) & 0xFFFF0000) | (board >> 48)
+
+
+def symmetries(board):  # 返回棋盘的8种旋转/镜像，顺序与symmetryDirs对应
+    m = mirror(board)
+    f = flip(board)
+    mf = mirror(f)
+    return [board, m, f, mf, transpose(board), transpose(m), transpose(f), transpose(mf)]
+
+
+# 每种对称变换下方向的对应关系，symmetryDirs[k][dir]为原方向在变换后棋盘上的方向
+# 方向与bitMove一致，0左 1右 2上 3下；镜像交换左右，翻转交换上下，转置交换左与上、右与下
+symmetryDirs = [[0, 1, 2, 3], [1, 0, 2, 3], [0, 1, 3, 2], [1, 0, 3, 2],
+                [2, 3, 0, 1], [3, 2, 0, 1], [2, 3, 1, 0], [3, 2, 1, 0]]
+
+
+rowLeftTable, rowLeftScore, rowRightTable, rowRightScore = _buildRowTables()
+
+
+def _moveRows(board, table, scoreTable):  # 对四行分别查表移动
+    newBoard = 0
+    score = 0
+    for shift in (0, 16, 32, 48):
+        row = (board >> shift) & ROW_MASK
+        newBoard |= table[row] << shift
+        score += scoreTable[row]
+    return newBoard, score
+
+
+def bitMove(board, dir):
+    """
+    位棋盘移动
+    参数:
+        board:位棋盘整数
+        dir:方向，与AIMap.move一致，0左 1右 2上 3下
+    返回值:
+        移动后的位棋盘和本次得分，未改变时返回原棋盘
+    """
+    if dir == 0:
+        return _moveRows(board, rowLeftTable, rowLeftScore)
+    elif dir == 1:
+        return _moveRows(board, rowRightTable, rowRightScore)
+    elif dir == 2:  # 上下移动通过转置后左右移动实现
+        newBoard, score = _moveRows(
+            transpose(board), rowLeftTable, rowLeftScore)
+        return transpose(newBoard), score
+    elif dir == 3:
+        newBoard, score = _moveRows(
+            transpose(board), rowRightTable, rowRightScore)
+        return transpose(newBoard), score
+
+
+def emptyCount(board):  # 统计空格子个数
+    board |= (board >> 2) & 0x3333333333333333
+    board |= board >> 1
+    return bin(~board & 0x1111111111111111).count('1')
+
+
+def encode(numMap):  # 将数值矩阵编码为位棋盘
+    board = 0
+    for r in range(4):
+        for c in range(4):
+            if numMap[r][c] != 0:
+                board |= (numMap[r][c].bit_length() - 1) << (4 * (4 * r + c))
+    return board
+
+
+tileValues = [0] + [1 << e for e in range(1, 16)]  # 指数对应的数值，0对应空格
+
+
+def decode(board):  # 将位棋盘解码为数值矩阵
+    return [[tileValues[(board >> shift) & 0xF] for shift in range(r, r + 16, 4)] for r in (0, 16, 32, 48)]
+
+
+# 连通块计数
+# 把每种数字所在的格子记为一个16位掩码（第4*r+c位对应第r行第c列），对每个掩码用位运算做洪水填充
+# 整个过程不递归，也不分配标记数组
+COL_LEFT = 0x1111  # 第0列的格子
+COL_RIGHT = 0x8888  # 第3列的格子
+islandsTable = None  # 可选的65536项查找表，掩码 -> 连通块个数，由buildIslandsTable生成
+_scratch = threading.local()  # bitIslands每个线程的临时掩码列表
+
+
+def maskIslands(mask):  # 计算一个掩码中四连通块的个数
+    count = 0
+    while mask:
+        block = mask & -mask  # 从最低位的格子开始填充
+        while True:
+            grow = (block | ((block << 1) & ~COL_LEFT) | ((block >> 1) & ~COL_RIGHT)
+                    | (block << 4) | (block >> 4)) & mask
+            if grow == block:
+                break
+            block = grow
+        mask ^= block
+        count += 1
+    return count
+
+
+def maskComponents(mask):  # 把掩码拆成各个四连通块的掩码，填充方式与maskIslands相同
+    blocks = []
+    while mask:
+        block = mask & -mask
+        while True:
+            grow = (block | ((block << 1) & ~COL_LEFT) | ((block >> 1) & ~COL_RIGHT)
+                    | (block << 4) | (block >> 4)) & mask
+            if grow == block:
+                break
+            block = grow
+        mask ^= block
+        blocks.append(block)
+    return blocks
+
+
+def buildIslandsTable():  # 预计算所有掩码的连通块个数，之后bitIslands直接查表
+    global islandsTable
+    if islandsTable is None:
+        islandsTable = [maskIslands(mask) for mask in range(65536)]
+    return islandsTable
+
+
+def bitIslands(board):  # 位棋盘的连通块个数，与islands相同
+    masks = getattr(_scratch, 'masks', None)  # 每种指数对应的掩码，每个线程复用自己的列表，后台的多个搜索线程可能同时调用
+    if masks is None:
+        masks = _scratch.masks = [0] * 16
+    used = 0
+    for k in range(16):
+        e = (board >> (4 * k)) & 0xF
+        if e:
+            masks[e] |= 1 << k
+            used |= 1 << e
+    count = 0
+    for e in range(1, 16):
+        if used >> e & 1:
+            if islandsTable is not None:
+                count += islandsTable[masks[e]]
+            else:
+                count += maskIslands(masks[e])
+            masks[e] = 0
+    return count
+
+
+# 与AIMap接口相同的位棋盘，用于AI搜索
+class BitMap:
+    def __init__(self, size=4, numMap: list = None, board=0):
+        self.size = size
+        self.score = 0
+        self.board = board
+        if isinstance(numMap, list):  # 与AIMap一致，传入的数值矩阵会被转置
+            self.board = transpose(encode(numMap))
+        elif board == 0:
+            self.add()  # 随机产生第一个随机数
+            self.add()  # 随机产生第二个随机数
+
+    @property
+    def map(self):  # 数值矩阵形式，用于评价函数
+        return decode(self.board)
+
+    def copy(self):
+        newMap = BitMap(self.size, board=self.board)
+        newMap.score = self.score
+        return newMap
+
+    def islands(self):  # 计算分散度，越分散得分越高
+        return bitIslands(self.board)
+
+    def move(self, dir):  # 方向与AIMap.move保持一致
+        newBoard, score = bitMove(self.board, dir)
+        if newBoard == self.board:
+            return False
+        self.board = newBoard
+        self.score += score
+        return True
+
+    def move_left(self):
+        return self.move(0)
+
+    def move_right(self):
+        return self.move(1)
+
+    def move_up(self):
+        return self.move(2)
+
+    def move_down(self):
+        return self.move(3)
+
+    def getAvailableCells(self):  # 返回所有的可以放数字的位置
+        AvCells = []
+        for i in range(self.size):
+            for j in range(self.size):
+                if (self.board >> (4 * (4 * i + j))) & 0xF == 0:
+                    AvCells.append([i, j])
+        return AvCells
+
+    def add(self):  # 新增2或4
+        cells = self.getAvailableCells()
+        if len(cells) > 0:
+            [r, c] = random.choice(cells)
+            self.add_xy(r, c, random.randint(1, 2) * 2)
+
+    def add_xy(self, x, y, val):
+        shift = 4 * (4 * x + y)
+        if (self.board >> shift) & 0xF == 0:
+            self.board |= (val.bit_length() - 1) << shift
+            return True
+        else:
+            return False
+
+    def remove_xy(self, x, y):
+        self.board &= ~(0xF << (4 * (4 * x + y)))
+
+    def over(self):  # 判断游戏结束
+        if emptyCount(self.board) > 0:
+            return False
+        for dir in (0, 2):  # 棋盘已满时，左右（上下）能否移动是一致的
+            if bitMove(self.board, dir)[0] != self.board:
+                return False
+        return True
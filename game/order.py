@@ -0,0 +1,78 @@
+class moveOrder:
+    """
+    走法排序
+    功能:
+        alpha-beta剪枝的效果取决于先搜索的走法是否最好，按以下顺序尝试max轮的方向：
+        置换表或上一轮迭代给出的最佳方向、同一层最近引起剪枝的方向（killer）、历史上引起剪枝越多越靠前的方向（history）
+        min轮的最差情况同样把同一层最近引起剪枝的放置方式放在最前面
+        一次searchMap中的各轮迭代加深共用同一个对象，前一轮记录的killer和history用于后一轮
+    参数:
+        killers:每层保留的killer个数，为0时不使用killer
+        history:是否使用history
+    """
+
+    def __init__(self, killers=2, history=True):
+        self.killerCount = killers
+        self.useHistory = history
+        self.rootDepth = 0
+        self.clear()
+
+    def clear(self):
+        self.killers = {}  # {层数: [方向]}，最近的在前
+        self.spawnKillers = {}  # {层数: [(格子, 数值)]}
+        self.history = [0] * 4  # 每个方向引起剪枝的累计权重
+
+    def ply(self, depth):  # 由剩余深度换算到距根节点的层数，与searchStats一致只看max轮
+        return self.rootDepth - depth
+
+    def moves(self, depth, firstMove=-1):
+        """
+        max轮尝试方向的顺序
+        参数:
+            depth:剩余深度
+            firstMove:置换表或上一轮迭代给出的最佳方向，为-1时没有
+        返回值:
+            四个方向的列表
+        """
+        order = [firstMove] if firstMove >= 0 else []
+        for move in self.killers.get(self.ply(depth), ()):
+            if move not in order:
+                order.append(move)
+        rest = [move for move in range(4) if move not in order]
+        if self.useHistory:
+            rest.sort(key=lambda move: -self.history[move])  # 排序是稳定的，权重相同时按方向顺序
+        return order + rest
+
+    def spawns(self, depth, situations):
+        """
+        min轮尝试最差情况的顺序
+        参数:
+            situations:[[格子, 数值]]，格子为[i, j]
+        返回值:
+            重新排列后的列表，引起过剪枝的放置方式在前，其余保持原来的顺序
+        """
+        killers = self.spawnKillers.get(self.ply(depth))
+        if not killers or len(situations) < 2:
+            return situations
+        first = [s for killer in killers for s in situations
+                 if (s[0][0], s[0][1], s[1]) == killer]
+        return first + [s for s in situations if s not in first]
+
+    def cut(self, depth, move):  # max轮的方向引起剪枝
+        if self.killerCount > 0:
+            killers = self.killers.setdefault(self.ply(depth), [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.killerCount:]
+        if self.useHistory:
+            self.history[move] += (depth + 1) * (depth + 1)  # 越接近根节点的剪枝省下的节点越多
+
+    def cutSpawn(self, depth, situation):  # min轮的放置方式引起剪枝
+        if self.killerCount > 0:
+            killer = (situation[0][0], situation[0][1], situation[1])
+            killers = self.spawnKillers.setdefault(self.ply(depth), [])
+            if killer in killers:
+                killers.remove(killer)
+            killers.insert(0, killer)
+            del killers[self.killerCount:]
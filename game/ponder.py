@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from game.map import BitMap, bitMove
+from game.search import searchMap, searchTimeout, boardMap
+from game.table import transTable
+
+
+def spawnOutcomes(board, move):
+    """
+    走完一步后可能出现的所有局面
+    参数:
+        board:位棋盘整数
+        move:移动方向，与BitMap.move一致
+    返回值:
+        按出现概率从大到小排列的位棋盘列表，先是各空位出现2，再是各空位出现4；不能移动时为空列表
+    """
+    if move < 0:
+        return []
+    newBoard = bitMove(board, move)[0]
+    if newBoard == board:
+        return []
+    cells = [shift for shift in range(0, 64, 4)
+             if (newBoard >> shift) & 0xF == 0]
+    return [newBoard | (exponent << shift) for exponent in [1, 2] for shift in cells]
+
+
+class ponderCache:
+    """
+    预搜索结果的缓存
+    功能:
+        以位棋盘整数为键保存searchResult，超过maxSize时淘汰最久未使用的结果
+    参数:
+        maxSize:最多保存的局面数
+    """
+
+    def __init__(self, maxSize=4096):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def peek(self, key):  # 查询但不计入命中统计
+        return self.entries.get(key)
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ponderer:
+    """
+    预搜索
+    功能:
+        在动画播放或玩家思考的空闲时间里，于后台线程中搜索接下来可能出现的局面，结果存入cache，
+        提示和AI先查cache，命中时不需要再搜索
+        先搜索当前局面，得到最佳方向后再按概率依次搜索该方向之后每个空位出现2或4的局面
+    参数:
+        cache:ponderCache，为None时新建
+        kwargs:传给searchMap的参数，如depth、budget；默认使用单独的置换表，不与前台搜索共用
+    """
+
+    def __init__(self, cache=None, **kwargs):
+        self.cache = cache if cache is not None else ponderCache()
+        self.kwargs = kwargs
+        if 'table' not in self.kwargs:
+            self.kwargs['table'] = transTable()
+        self.thread = None
+        self.cancelEvent = None
+
+    def start(self, board, move=None, **kwargs):
+        """
+        开始预搜索，之前的预搜索会被停止
+        参数:
+            board:Board实例
+            move:已经决定的方向，给出时只搜索该方向之后的局面，为None时先搜索当前局面
+            kwargs:覆盖构造时给出的searchMap参数
+        """
+        self.stop()
+        self.cancelEvent = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(
+            boardMap(board).board, move, self.cancelEvent, dict(self.kwargs, **kwargs)), daemon=True)
+        self.thread.start()
+
+    def run(self, board, move, event, options):  # 在后台线程中执行
+        try:
+            if move is None:
+                result = self.cache.peek(board)
+                if result is None:
+                    result = searchMap(BitMap(4, board=board),
+                                       cancel=event, **options)
+                    self.cache.put(board, result)
+                move = result.move
+            for position in spawnOutcomes(board, move):
+                if event.is_set():
+                    return
+                if position not in self.cache:
+                    self.cache.put(position, searchMap(
+                        BitMap(4, board=position), cancel=event, **options))
+        except searchTimeout:  # 被停止
+            return
+
+    def stop(self):  # 停止预搜索，已经完成的结果保留在cache中
+        if self.cancelEvent is not None:
+            self.cancelEvent.set()
+            self.cancelEvent = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def busy(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def lookup(self, board):
+        """
+        查询预搜索的结果
+        参数:
+            board:Board实例
+        返回值:
+            searchResult，没有时返回None
+        """
+        return self.cache.get(boardMap(board).board)
@@ -0,0 +1,247 @@
+import mmap
+import os
+import random
+import tempfile
+import numpy as np
+from game.map import BitMap, bitMove
+
+# 录像文件格式
+# 文件由若干局首尾相接组成，只追加写入，每一局为一个局头加若干步：
+#   局头 HEADER_SIZE 字节: 标记字节(0x80|VERSION)、种子(9字节，每字节7位，低位在前)、初始棋盘(16字节，格子k=4x+y的指数)
+#   每一步 1 字节: 方向<<5 | 放置的格子<<1 | (放置的是4)
+# 格子(x, y)与Board.map[x][y]、BitMap.add_xy(x, y)相同，方向与Board.move、BitMap.move相同
+# 只有标记字节的最高位为1，不需要长度字段，一次扫描最高位就能找到所有局的起点；写到一半中断的文件也能读出已写完的步
+VERSION = 1
+MARKER = 0x80 | VERSION
+SEED_BYTES = 9
+SEED_LIMIT = 1 << (7 * SEED_BYTES)  # 种子的范围为[0, SEED_LIMIT)
+HEADER_SIZE = 1 + SEED_BYTES + 16
+SCAN_CHUNK = 1 << 24  # 查找局起点时每次扫描的字节数，限制临时数组的大小
+
+
+def boardCells(board):
+    """
+    初始棋盘的16个格子的指数
+    参数:
+        board:位棋盘整数，或按[x][y]取数值的4x4矩阵（Board.map、numMap）
+    """
+    if isinstance(board, int):
+        return [(board >> (4 * k)) & 0xF for k in range(16)]
+    return [int(board[k // 4][k % 4]).bit_length() - 1 if board[k // 4][k % 4] != 0 else 0
+            for k in range(16)]
+
+
+def encodeHeader(seed, board):
+    """
+    局头
+    参数:
+        seed:本局的随机种子
+        board:初始棋盘，见boardCells
+    返回值:
+        HEADER_SIZE字节的bytes
+    """
+    if not 0 <= seed < SEED_LIMIT:
+        raise ValueError('replay seed must be in [0, 2**63)')
+    return bytes([MARKER] + [(seed >> (7 * k)) & 0x7F for k in range(SEED_BYTES)] + boardCells(board))
+
+
+def encodeStep(move, x, y, value):  # 一步编码为一个字节，value为放置的2或4
+    return (move << 5) | ((4 * x + y) << 1) | (value == 4)
+
+
+def decodeSteps(steps):
+    """
+    批量解码
+    参数:
+        steps:uint8数组
+    返回值:
+        (方向, 格子, 数值)三个数组，格子为4x+y，数值为2或4
+    """
+    steps = np.asarray(steps, dtype=np.uint8)
+    return steps >> 5, (steps >> 1) & 0xF, 2 << (steps & 1)
+
+
+class replayWriter:
+    """
+    录像写入
+    功能:
+        把对局逐步追加到录像文件，start开始新的一局，step记录一步（移动方向以及之后放置的数字）
+        可以设为Board.replay，Board在New、移动和放置数字时自动记录；也可以用write追加simulate在其他进程中编码好的整局
+    参数:
+        path:录像文件路径，已有的内容保留，新的局追加在后面
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.games = 0
+        self.steps = 0
+
+    def start(self, seed, board):  # 开始新的一局，board为初始棋盘，见boardCells
+        self.file.flush()  # 上一局写入磁盘，中途退出时最多丢失当前这一局
+        self.file.write(encodeHeader(seed, board))
+        self.games += 1
+
+    def step(self, move, x, y, value):
+        self.file.write(bytes([encodeStep(move, x, y, value)]))
+        self.steps += 1
+
+    def write(self, data):  # 追加已经编码好的一局或多局
+        self.file.write(data)
+        self.games += int(np.count_nonzero(np.frombuffer(data, dtype=np.uint8) & 0x80))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class replayFile:
+    """
+    录像读取
+    功能:
+        用mmap映射整个文件，numpy.frombuffer直接在映射上取数据，不复制；打开时扫描一次找到所有局的起点，
+        之后按下标取任意一局的种子、初始棋盘和步，或重现任意一步之后的局面
+        文件末尾没有写完的局头被忽略
+    参数:
+        path:录像文件路径
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:  # 空文件不能映射
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map is None:
+            self.data = np.zeros(0, dtype=np.uint8)
+        else:
+            self.data = np.frombuffer(self.map, dtype=np.uint8)
+        starts = [np.flatnonzero(self.data[k:k + SCAN_CHUNK] & 0x80) + k
+                  for k in range(0, len(self.data), SCAN_CHUNK)]
+        starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+        if len(starts) > 0 and starts[0] != 0:
+            raise ValueError('{} is not a replay file'.format(path))
+        if np.any(self.data[starts] != MARKER):
+            raise ValueError('unsupported replay version in {}'.format(path))
+        ends = np.append(starts[1:], len(self.data))
+        complete = ends - starts >= HEADER_SIZE
+        self.starts = starts[complete]
+        self.ends = ends[complete]
+        self.lengths = self.ends - self.starts - HEADER_SIZE  # 每一局的步数
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))  # 每一局第一步在所有步中的下标
+
+    def __len__(self):  # 局数
+        return len(self.starts)
+
+    def totalSteps(self):
+        return int(self.offsets[-1])
+
+    def seed(self, game):
+        header = self.data[self.starts[game] + 1:self.starts[game] + 1 + SEED_BYTES]
+        return sum(int(header[k]) << (7 * k) for k in range(SEED_BYTES))
+
+    def cells(self, game):  # 初始棋盘16个格子的指数，uint8视图
+        start = self.starts[game] + 1 + SEED_BYTES
+        return self.data[start:start + 16]
+
+    def initial(self, game):  # 初始位棋盘
+        board = 0
+        for k, exponent in enumerate(self.cells(game).tolist()):
+            board |= exponent << (4 * k)
+        return board
+
+    def steps(self, game):  # 一局的所有步，uint8视图，用decodeSteps解码
+        return self.data[self.starts[game] + HEADER_SIZE:self.ends[game]]
+
+    def allSteps(self):
+        """
+        所有局的所有步，按局的顺序连接，用于批量统计
+        返回值:
+            uint8数组，第game局的步为[offsets[game], offsets[game+1])；只有一局时为视图，否则复制一次
+        """
+        if len(self) == 1:
+            return self.steps(0)
+        return np.concatenate([self.steps(game) for game in range(len(self))] or [self.data[:0]])
+
+    def locate(self, index):  # 所有步中的第index步属于哪一局的第几步
+        game = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        if index < 0 or game >= len(self):
+            raise IndexError('replay step index out of range')
+        return game, index - int(self.offsets[game])
+
+    def position(self, game, index=None):
+        """
+        重现局面
+        参数:
+            game:第几局
+            index:走了几步之后的局面，0为初始局面，为None时为最后的局面
+        返回值:
+            BitMap，score为这几步的得分
+        """
+        steps = self.steps(game)
+        if index is None:
+            index = len(steps)
+        if not 0 <= index <= len(steps):
+            raise IndexError('replay step index out of range')
+        aiMap = BitMap(4, board=self.initial(game))
+        for move, cell, value in zip(*(column.tolist() for column in decodeSteps(steps[:index]))):
+            aiMap.board, score = bitMove(aiMap.board, move)
+            aiMap.score += score
+            aiMap.board |= (value.bit_length() - 1) << (4 * cell)
+        return aiMap
+
+    def close(self):
+        self.data = self.starts = self.ends = None
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:  # 外部还持有steps等视图时由垃圾回收关闭
+                pass
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def testReplay(games=20, steps=200):  # 随机对局写入临时的录像文件，再逐步重现，检查与对局中的局面一致
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, 'test.replay')
+    boards = []
+    with replayWriter(path) as writer:
+        for i in range(games):
+            rng = random.Random(i)
+            aiMap = BitMap(4, board=0x1 << (4 * rng.randrange(16)))
+            writer.start(i, aiMap.board)
+            history = [(aiMap.board, 0)]
+            for k in range(steps):
+                move = rng.randrange(4)
+                if not aiMap.move(move):
+                    continue
+                [x, y] = rng.choice(aiMap.getAvailableCells())
+                value = rng.choice([2, 4])
+                aiMap.add_xy(x, y, value)
+                writer.step(move, x, y, value)
+                history.append((aiMap.board, aiMap.score))
+            boards.append(history)
+    with replayFile(path) as replay:
+        assert len(replay) == games
+        for i in range(games):
+            assert replay.seed(i) == i and replay.lengths[i] == len(boards[i]) - 1
+            for k in range(0, len(boards[i]), 7):
+                position = replay.position(i, k)
+                assert (position.board, position.score) == boards[i][k], (i, k)
+            assert replay.locate(int(replay.offsets[i])) == (i, 0)
+    directory.cleanup()
+    return True
@@ -0,0 +1,425 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import game.val as val
+from game.map import BitMap, bitMove, buildIslandsTable
+from game.table import transTable, EXACT, LOWER, UPPER
+from game.stats import searchStats
+from game.order import moveOrder
+
+buildIslandsTable()  # min轮对每个空位都要计算连通块，预先建好查找表
+
+
+# 定义搜索结果类，用于方便处理返回值
+class searchResult:
+    def __init__(self, move=-1, score=0, positions=0, cutoffs=0, hits=0, misses=0, depth=-1) -> None:
+        self.move = move
+        self.positions = positions
+        self.cutoffs = cutoffs
+        self.score = score
+        self.hits = hits  # 置换表命中次数
+        self.misses = misses  # 置换表未命中次数
+        self.depth = depth  # 迭代加深时实际完成的搜索深度
+        self.stats = None  # 并行搜索时子进程返回的searchStats
+
+
+# 迭代加深超过时间预算时用于中断搜索
+class searchTimeout(Exception):
+    pass
+
+
+class searchDeadline:
+    """
+    可以取消的截止时间
+    功能:
+        可以代替数字作为search的deadline参数，search中time.time() > deadline的比较会调用__lt__，
+        到达截止时间或者cancel被设置时都视为超时，用于从其他线程中断搜索
+    参数:
+        time:截止时间（time.time()），为None时只在取消时中断
+        cancel:threading.Event，设置后中断搜索
+    """
+
+    def __init__(self, time=None, cancel=None):
+        self.time = time
+        self.cancel = cancel
+
+    def __lt__(self, now):
+        return self.cancel.is_set() or (self.time is not None and self.time < now)
+
+
+def boundType(score, alpha, beta):  # 根据alpha-beta窗口判断搜索结果的类型
+    if score <= alpha:
+        return UPPER
+    if score >= beta:
+        return LOWER
+    return EXACT
+
+
+#
+def search(thisBoard: BitMap, depth, alpha, beta, positions, cutoffs, plyaerTurn: bool, table: transTable = None, deadline=None, firstMove=-1, stats: searchStats = None, ordering: moveOrder = None) -> searchResult:
+    """
+    搜索最优移动方向
+    功能:
+        使用minmax搜索，并使用alpha，beta剪枝减少搜索次数
+    参数:
+        board:实例board界面
+        depth:搜索深度
+        alpha,beta:剪枝所需的参数
+        positions,cutoffs:用于记录位置与剪枝次数
+        table:置换表，为None时不使用
+        deadline:截止时间（time.time()），超时抛出searchTimeout
+        firstMove:优先尝试的方向，用于迭代加深时沿用上一轮的最佳方向
+        stats:searchStats，为None时不做统计
+        ordering:moveOrder，为None时max轮按0到3的顺序、min轮按空格顺序尝试
+    返回值:
+        searchResult:包含各种参数,详见searchResult类
+    """
+    if deadline is not None and time.time() > deadline:
+        raise searchTimeout()
+    if stats is not None:
+        stats.node(depth, plyaerTurn)
+
+    if table is not None:  # 先查询置换表，深度足够且在窗口内可用时直接返回
+        key, sym = table.key(thisBoard.board, plyaerTurn)
+        entry = table.probe(key, sym)
+        if entry is not None and firstMove < 0:  # 深度不够的表项也可以提供走法顺序
+            firstMove = entry[3]
+        if entry is not None and entry[0] >= depth:
+            entryDepth, flag, score, move = entry
+            if flag == EXACT:
+                return searchResult(move, score, positions, cutoffs)
+            if flag == LOWER and score >= beta:
+                return searchResult(move, beta, positions, cutoffs)
+            if flag == UPPER and score <= alpha:
+                return searchResult(move, alpha, positions, cutoffs)
+
+    bestScore = 0
+    bestMove = -1
+    result = searchResult()
+
+    if plyaerTurn:  # max轮
+        bestScore = alpha  # 最高分为alpha
+        if ordering is not None:  # 最可能最优的方向放在最前面，更容易剪枝
+            order = ordering.moves(depth, firstMove)
+        else:
+            order = [0, 1, 2, 3]
+            if firstMove >= 0:
+                order.remove(firstMove)
+                order.insert(0, firstMove)
+        children = 0
+        for direction in order:  # 四个方向分别进行遍历
+            if stats is not None:
+                startTime = time.perf_counter()
+            newBoard = thisBoard.copy()  # 新建一个棋盘防止影响到正式游戏
+            changed = newBoard.move(direction)  # 相对应方向移动
+            if stats is not None:
+                stats.moveTime += time.perf_counter() - startTime
+            if changed:  # 如果这个方向可以移动
+                positions += 1  # positions自增
+                children += 1
+                if depth == 0:  # 如果已经搜索到最底层了
+                    if stats is not None:
+                        startTime = time.perf_counter()
+                    result.move = direction
+                    result.score = val.tableEvaluation(
+                        newBoard.board)  # 返回当前局面的评价值
+                    if stats is not None:
+                        stats.evalTime += time.perf_counter() - startTime
+                else:  # 没有到达最深
+                    result = search(
+                        newBoard, depth-1, bestScore, beta, positions, cutoffs, False, table, deadline, stats=stats, ordering=ordering)  # 进行min轮，即让AI下出对局面最不利的一步
+                    if result.score > 9900:  # 如果得分已经很高则适当减少
+                        result.score -= 1
+                    positions = result.positions
+                    cutoffs = result.cutoffs  # 将返回值进行处理
+
+                if result.score > bestScore:
+                    bestScore = result.score
+                    bestMove = direction
+                if bestScore >= beta:  # 如果最高值不小于beta，则已经证明该走法优于前面的最优，则本深度下后面不用继续计算。
+                    # 等于beta时也剪枝：子节点剪枝时返回的正是窗口边界，严格比较几乎不会剪枝
+                    cutoffs += 1
+                    if ordering is not None:
+                        ordering.cut(depth, direction)
+                    if stats is not None:
+                        stats.cutoff(depth, plyaerTurn, children == 1)
+                        stats.expand(children)
+                    if table is not None:
+                        table.store(key, sym, depth, LOWER, beta, bestMove)
+                    return searchResult(bestMove, beta, positions, cutoffs)
+        if stats is not None:
+            stats.expand(children)
+        if table is not None:  # 落在窗口边界上的值只是上界或下界
+            table.store(key, sym, depth, boundType(
+                bestScore, alpha, beta), bestScore, bestMove)
+    else:  # min轮，让AI走出最差一步
+        bestScore = beta
+        worstSituation = []
+        if stats is not None:
+            startTime = time.perf_counter()
+        # 生成可能的所有情况，并进行评估；每种情况的得分由所在行列和相邻连通块的变化得到，不再逐个放置后整盘计算
+        cells, score_2, score_4 = val.spawnScores(thisBoard.board)
+
+        maxScore = max(max(score_2), max(score_4))  # 找到最差的情况
+        for i in range(len(score_2)):  # 最差的情况可能不止一种，所以遍历一遍防止遗漏
+            if score_2[i] == maxScore:
+                worstSituation.append([cells[i], 2])
+        for i in range(len(score_4)):
+            if score_4[i] == maxScore:
+                worstSituation.append([cells[i], 4])
+        if ordering is not None:
+            worstSituation = ordering.spawns(depth, worstSituation)
+        if stats is not None:
+            stats.spawnTime += time.perf_counter() - startTime
+            stats.expand(len(worstSituation))
+        tried = 0
+        for situation in worstSituation:  # 遍历所有最差情况
+            nnewBoard = thisBoard.copy()
+            if not nnewBoard.add_xy(situation[0][0], situation[0][1], situation[1]):  # 空位来自getAvailableCells，不应失败
+                raise RuntimeError("search cannot place {} on {}".format(situation, nnewBoard.map))
+            positions += 1
+            tried += 1
+            result = search(nnewBoard, depth, alpha,
+                            bestScore, positions, cutoffs, True, table, deadline, stats=stats, ordering=ordering)  # 进一步搜索
+            positions = result.positions
+            cutoffs = result.cutoffs
+
+            if result.score < bestScore:
+                bestScore = result.score
+
+            if bestScore <= alpha:  # 剪枝同理
+                cutoffs += 1
+                if ordering is not None:
+                    ordering.cutSpawn(depth, situation)
+                if stats is not None:
+                    stats.cutoff(depth, plyaerTurn, tried == 1)
+                if table is not None:
+                    table.store(key, sym, depth, UPPER, alpha, -1)
+                return searchResult(-1, alpha, positions, cutoffs)
+        if table is not None:
+            table.store(key, sym, depth, boundType(
+                bestScore, alpha, beta), bestScore, -1)
+
+    return searchResult(bestMove, bestScore, positions, cutoffs)
+
+
+# 默认的置换表，在每一步之间复用，已经搜索过的局面在下一步仍然有效
+defaultTable = transTable()
+
+
+# 根节点并行搜索使用的进程池，第一次使用时创建，之后进程数不变时每一步都复用
+pool = None
+poolWorkers = None  # 创建pool时的workers参数
+
+
+def getPool(workers=None):  # workers为进程数，直接传给ProcessPoolExecutor；与现有的进程池不同时重新创建
+    global pool, poolWorkers
+    if pool is not None and workers != poolWorkers:
+        closePool()
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        poolWorkers = workers
+    return pool
+
+
+def closePool():
+    global pool, poolWorkers
+    if pool is not None:
+        pool.shutdown()
+        pool = None
+        poolWorkers = None
+
+
+def moveSearch(board, direction, depth, engine='minimax', deadline=None, collect=False, ordering=None) -> searchResult:
+    """
+    在子进程中搜索根节点的一个方向
+    参数:
+        board:位棋盘整数，只传整数，避免序列化整个棋盘对象
+        direction:根节点的移动方向
+        collect:是否统计，统计结果放在返回值的stats中带回主进程
+        每个任务使用新的置换表，同一局面重复搜索时结果相同，置换表命中次数放在返回值的hits、misses中
+        ordering:(killers, history)，子进程按此设置新建moveOrder，为None时不排序，与串行搜索的默认一致
+        其余参数与rootSearch相同
+    返回值:
+        searchResult:move为direction，score为该方向的评价
+    """
+    stats = None
+    if collect:
+        stats = searchStats()
+        stats.rootDepth = depth
+    newBoard = bitMove(board, direction)[0]
+    if depth == 0:
+        result = searchResult(direction, val.tableEvaluation(newBoard), 1)
+    elif engine == 'minimax':
+        if ordering is not None:
+            ordering = moveOrder(*ordering)
+            ordering.rootDepth = depth
+        table = transTable()
+        result = search(BitMap(4, board=newBoard), depth-1, -1000000, 1000000,
+                        1, 0, False, table, deadline, stats=stats, ordering=ordering)
+        if result.score > 9900:  # 与search的max轮保持一致
+            result.score -= 1
+        result.hits, result.misses = table.hits, table.misses
+    else:
+        import game.expectimax as expectimax
+        engine = expectimax.expectimaxEngine(deadline=deadline, stats=stats)
+        result = searchResult(score=engine.chanceNode(newBoard, depth - 1, 1.0),
+                              positions=engine.positions + 1, cutoffs=engine.cutoffs)
+    result.move = direction
+    result.stats = stats
+    return result
+
+
+def parallelSearch(nAIMap: BitMap, depth, deadline=None, engine='minimax', workers=None, stats: searchStats = None, ordering: moveOrder = None) -> searchResult:
+    """
+    根节点并行搜索
+    功能:
+        四个方向的子树互不相关，分别交给进程池中的进程搜索，再取最好的方向
+        各方向之间不再共享alpha，所以总的搜索位置会比串行多，但耗时按核数缩短
+        给出ordering时只把它的设置传给子进程，killer和history在子进程中重新记录
+    """
+    board = nAIMap.board
+    options = (ordering.killerCount, ordering.useHistory) if ordering is not None else None
+    futures = [getPool(workers).submit(moveSearch, board, direction, depth, engine, deadline, stats is not None, options)
+               for direction in range(4) if bitMove(board, direction)[0] != board]
+    if stats is not None:  # 根节点本身在主进程中统计
+        stats.node(depth, True)
+        stats.expand(len(futures))
+    best = searchResult(score=-1000000)
+    try:
+        for future in futures:  # 按方向顺序取结果，分数相同时与串行一样选前面的方向
+            result = future.result()
+            best.positions += result.positions
+            best.cutoffs += result.cutoffs
+            best.hits += result.hits
+            best.misses += result.misses
+            if stats is not None:
+                stats.merge(result.stats)
+            if result.score > best.score:
+                best.score = result.score
+                best.move = result.move
+    except searchTimeout:
+        for future in futures:
+            future.cancel()
+        raise
+    return best
+
+
+def rootSearch(nAIMap: BitMap, depth, table=None, deadline=None, firstMove=-1, engine='minimax', workers=None, stats: searchStats = None, ordering: moveOrder = None) -> searchResult:
+    """
+    按指定的搜索引擎搜索一次
+    参数:
+        engine:'minimax'为带alpha-beta剪枝的minmax，'expectimax'为按生成概率求期望的搜索
+        workers:不为None时在进程池中并行搜索根节点的各个方向，此时不使用table
+        stats:searchStats，为None时不做统计
+        ordering:moveOrder，只对minimax有效，并行时子进程按相同的设置各自排序
+    """
+    if engine not in ('minimax', 'expectimax'):
+        raise ValueError("search has no engine: {}".format(engine))
+    if stats is not None:
+        stats.rootDepth = depth
+    if workers is not None:
+        return parallelSearch(nAIMap, depth, deadline, engine, workers, stats, ordering)
+    if engine == 'minimax':
+        if ordering is not None:
+            ordering.rootDepth = depth
+        return search(nAIMap, depth, -1000000, 1000000, 0, 0, True, table, deadline, firstMove, stats, ordering)
+    import game.expectimax as expectimax  # 在这里导入，避免与expectimax模块循环导入
+    return expectimax.expectimaxEngine(deadline=deadline, stats=stats).search(nAIMap.board, depth)
+
+
+def searchBestMove(board, depth=4, table=defaultTable, budget=None, engine='minimax', workers=None, stats: searchStats = None) -> searchResult:
+    """
+    搜索最优移动方向
+    功能:
+        调用search,并给出参数
+        给出budget时使用迭代加深，从深度0开始逐层加深直到depth或时间用完
+    参数:
+        board:实例board界面
+        depth:搜索深度，迭代加深时为最大深度
+        table:置换表，为None时不使用，只对串行的minimax有效
+        budget:时间预算，单位毫秒，为None时按固定深度搜索
+        engine:搜索引擎，'minimax'或'expectimax'
+        workers:根节点并行搜索的进程数，为None时不并行
+        stats:searchStats，为None时不做统计，给出时每一步结束后调用其回调
+    返回值:
+        searchResult:包含最佳动作以及positions，cutoffs和置换表命中情况，depth为完成的深度
+    """
+    return searchMap(boardMap(board), depth, table, budget, engine, workers, stats)
+
+
+def boardMap(board) -> BitMap:
+    """
+    把Board转换为搜索使用的BitMap
+    功能:
+        Board.map的第一维为列，BitMap(4, numMap)会转置，这里先转置回来，
+        使BitMap的0左 1右 2上 3下与Board的0上 1下 2左 3右对应同一个实际方向，搜索给出的方向可以直接用于Board
+    """
+    return BitMap(4, [list(column) for column in zip(*board.numMap())])
+
+
+def searchMap(nAIMap: BitMap, depth=4, table=defaultTable, budget=None, engine='minimax', workers=None, stats: searchStats = None, cancel=None, ordering=False) -> searchResult:
+    """
+    对位棋盘搜索最优移动方向，返回的方向与BitMap.move一致
+    参数:
+        cancel:threading.Event，在其他线程中设置后搜索尽快中断并抛出searchTimeout，不能与workers同时使用
+        ordering:killer和history走法排序，True时新建moveOrder，也可以传入moveOrder对象，各轮迭代加深共用同一个对象；
+                 min轮只保留最差的放置方式，可剪的分支很少，排序省下的位置数在误差范围内，所以默认不使用
+        其余参数与searchBestMove相同
+    """
+    if cancel is not None and workers is not None:
+        raise ValueError("searchMap cannot cancel a parallel search")
+    if engine != 'minimax' or workers is not None:
+        table = None
+    if table is not None:
+        table.resetStats()
+    if stats is not None:
+        stats.start()
+    firstDeadline = searchDeadline(cancel=cancel) if cancel is not None else None
+    if ordering is True:
+        ordering = moveOrder()
+    elif ordering is False:
+        ordering = None
+    try:
+        if budget is None:
+            newBest = rootSearch(nAIMap, depth, table, firstDeadline,
+                                 engine=engine, workers=workers, stats=stats, ordering=ordering)
+            newBest.depth = depth
+        else:
+            deadline = time.time() + budget / 1000
+            if cancel is not None:
+                deadline = searchDeadline(deadline, cancel)
+            newBest = None
+            for nowDepth in range(depth + 1):
+                try:  # 第一层必须完成（除非被取消），保证总能给出一个方向
+                    result = rootSearch(nAIMap, nowDepth, table,
+                                        deadline if newBest is not None else firstDeadline,
+                                        newBest.move if newBest is not None else -1, engine, workers, stats, ordering)
+                except searchTimeout:
+                    if newBest is None:
+                        raise
+                    break
+                result.depth = nowDepth
+                if newBest is not None:
+                    result.positions += newBest.positions
+                    result.cutoffs += newBest.cutoffs
+                    result.hits += newBest.hits  # 并行搜索时为子进程的合计，串行时在最后由table给出
+                    result.misses += newBest.misses
+                newBest = result
+    except searchTimeout:
+        if stats is not None:
+            stats.stop()
+        raise
+    if table is not None:
+        newBest.hits, newBest.misses = table.hits, table.misses
+    if stats is not None:
+        stats.finish(newBest)
+    return newBest
+
+
+def getBestMove(board, depth=4, table=defaultTable, budget=None, engine='minimax', workers=None, stats: searchStats = None):
+    """
+    搜索最优移动方向
+    返回值:
+        最佳动作
+    """
+    return searchBestMove(board, depth, table, budget, engine, workers, stats).move
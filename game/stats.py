@@ -0,0 +1,121 @@
+import cProfile
+import time
+
+
+class searchStats:
+    """
+    搜索统计
+    功能:
+        记录一次搜索中每一层的节点数和剪枝数，评价函数、走法生成和min轮空位打分各自的耗时，
+        分支因子以及置换表命中率；搜索函数只在传入该对象时才计时，不传时几乎没有额外开销
+    参数:
+        callback:每一步搜索完成后调用callback(stats, result)，result为searchResult
+        profile:不为None时用cProfile记录搜索，每一步结束后把累计结果写入该路径，可用pstats查看
+    """
+
+    def __init__(self, callback=None, profile=None):
+        self.callback = callback
+        self.profile = profile
+        self.profiler = cProfile.Profile() if profile is not None else None
+        self.moves = 0  # 已经完成统计的步数
+        self.reset()
+
+    def reset(self):  # 每一步开始时清零
+        self.rootDepth = 0
+        self.nodes = {}  # {层数: 节点数}，根节点为第0层，max轮与min轮各算一层
+        self.cutoffs = {}  # {层数: 剪枝次数}
+        self.firstCutoffs = 0  # 第一个子节点就引起剪枝的次数，越多说明走法顺序越好
+        self.expanded = 0  # 展开过子节点的节点数
+        self.children = 0  # 子节点总数
+        self.evalTime = 0.0
+        self.moveTime = 0.0
+        self.spawnTime = 0.0
+        self.totalTime = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.startTime = 0.0
+
+    def ply(self, depth, plyaerTurn):  # 由剩余深度换算到距根节点的层数
+        return 2 * (self.rootDepth - depth) + (0 if plyaerTurn else -1)
+
+    def node(self, depth, plyaerTurn):
+        ply = self.ply(depth, plyaerTurn)
+        self.nodes[ply] = self.nodes.get(ply, 0) + 1
+
+    def cutoff(self, depth, plyaerTurn, first=False):  # first为是否在第一个子节点就剪枝
+        ply = self.ply(depth, plyaerTurn)
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+        if first:
+            self.firstCutoffs += 1
+
+    def expand(self, children):  # 记录一个内部节点的子节点数，用于计算分支因子
+        if children > 0:
+            self.expanded += 1
+            self.children += children
+
+    def start(self):
+        self.reset()
+        self.startTime = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):  # 搜索被中断时只停止cProfile，不调用回调
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def finish(self, result):
+        """
+        一步搜索完成
+        参数:
+            result:searchResult，从中读取置换表命中情况
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile)
+        self.totalTime = time.perf_counter() - self.startTime
+        self.hits, self.misses = result.hits, result.misses
+        self.moves += 1
+        if self.callback is not None:
+            self.callback(self, result)
+
+    def merge(self, other):  # 合并子进程中的统计，用于根节点并行搜索
+        for ply, count in other.nodes.items():
+            self.nodes[ply] = self.nodes.get(ply, 0) + count
+        for ply, count in other.cutoffs.items():
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + count
+        self.firstCutoffs += other.firstCutoffs
+        self.expanded += other.expanded
+        self.children += other.children
+        self.evalTime += other.evalTime
+        self.moveTime += other.moveTime
+        self.spawnTime += other.spawnTime
+
+    def branching(self):  # 平均分支因子
+        return self.children / self.expanded if self.expanded > 0 else 0.0
+
+    def cutoffRate(self):  # 剪枝次数占展开节点的比例
+        return sum(self.cutoffs.values()) / self.expanded if self.expanded > 0 else 0.0
+
+    def firstCutoffRate(self):  # 剪枝中在第一个子节点就发生的比例
+        total = sum(self.cutoffs.values())
+        return self.firstCutoffs / total if total > 0 else 0.0
+
+    def hitRate(self):  # 置换表命中率，没有使用置换表时为None
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else None
+
+    def asDict(self):
+        return {'nodes': dict(sorted(self.nodes.items())),
+                'cutoffs': dict(sorted(self.cutoffs.items())),
+                'branching': self.branching(),
+                'cutoffRate': self.cutoffRate(), 'firstCutoffRate': self.firstCutoffRate(),
+                'evalTime': self.evalTime, 'moveTime': self.moveTime,
+                'spawnTime': self.spawnTime, 'totalTime': self.totalTime,
+                'hits': self.hits, 'misses': self.misses, 'hitRate': self.hitRate()}
+
+    def report(self):  # 一行文字的摘要，用于打印
+        hitRate = self.hitRate()
+        return 'nodes {} cutoffs {} ({:.1%} of expanded, {:.1%} on first child) branching {:.2f} eval {:.1f}ms move {:.1f}ms spawn {:.1f}ms total {:.1f}ms tt {}'.format(
+            sum(self.nodes.values()), sum(self.cutoffs.values()), self.cutoffRate(), self.firstCutoffRate(), self.branching(),
+            self.evalTime * 1000, self.moveTime * 1000, self.spawnTime * 1000, self.totalTime * 1000,
+            '-' if hitRate is None else '{:.1%}'.format(hitRate))
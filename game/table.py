@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from game.map import symmetries, symmetryDirs
+
+# 置换表中记录的值的类型，对应alpha-beta窗口下的精确值、下界和上界
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+ENTRY_BYTES = 200  # 每个表项大约占用的内存，用于根据内存上限估算容量
+
+
+class transTable:
+    """
+    置换表
+    功能:
+        记录已经搜索过的局面，不同走法到达同一局面时直接复用结果
+        局面先经过8种旋转/镜像取最小值作为键，对称的局面共用一个表项
+    参数:
+        maxMemory:内存上限，单位MB
+        policy:替换策略，'lru'淘汰最久未使用的表项，'depth'按哈希分槽，深度更深的结果优先保留
+        symmetry:是否合并对称局面
+    """
+
+    def __init__(self, maxMemory=16, policy='lru', symmetry=True):
+        if policy not in ('lru', 'depth'):
+            raise ValueError("transTable has no policy: {}".format(policy))
+        self.capacity = max(1, int(maxMemory * 1024 * 1024) // ENTRY_BYTES)
+        self.policy = policy
+        self.symmetry = symmetry
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        if self.policy == 'lru':
+            self.entries = OrderedDict()
+        else:
+            self.entries = [None] * self.capacity
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        if self.policy == 'lru':
+            return len(self.entries)
+        return self.capacity - self.entries.count(None)
+
+    def key(self, board, plyaerTurn):
+        """
+        计算局面的键
+        返回值:
+            键以及对应的对称变换编号，用于在原局面和规范局面之间转换方向
+        """
+        if not self.symmetry:
+            return (board, plyaerTurn), 0
+        boards = symmetries(board)
+        canon = min(boards)
+        return (canon, plyaerTurn), boards.index(canon)
+
+    def probe(self, key, sym):
+        """
+        查询置换表
+        返回值:
+            (深度, 类型, 分数, 原局面下的最佳方向)，没有表项时返回None
+        """
+        if self.policy == 'lru':
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        else:
+            entry = self.entries[hash(key) % self.capacity]
+            if entry is not None:
+                entry = entry[1:] if entry[0] == key else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move = entry[3]
+        if move >= 0:  # 规范局面下的方向换回原局面下的方向
+            move = symmetryDirs[sym].index(move)
+        return entry[0], entry[1], entry[2], move
+
+    def store(self, key, sym, depth, flag, score, move):
+        if move >= 0:
+            move = symmetryDirs[sym][move]
+        if self.policy == 'lru':
+            self.entries[key] = (depth, flag, score, move)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        else:
+            index = hash(key) % self.capacity
+            old = self.entries[index]
+            if old is None or old[0] == key or old[1] <= depth:
+                self.entries[index] = (key, depth, flag, score, move)
@@ -1,22 +1,140 @@
-from pygame.locals import *
+from collections import OrderedDict
 from board.board import *
-from game.AI2048 import *
+from game.worker import searchWorker
+from game.ponder import ponderer
 
-def tip_2048(board, gap=50):
+
+class tipService:
+    """
+    提示服务
+    功能:
+        按局面缓存提示结果，同一局面再次点击Tip时直接返回，不再搜索
+        缓存以Board.key()为键，局面改变后键随之改变，旧局面的提示自然失效；超过maxSize时淘汰最久未使用的局面
+        deeper为True时，同一局面重复点击会在后台按更深的深度重新搜索，直到maxDepth
+    参数:
+        depth:第一次提示的搜索深度
+        maxDepth:重复点击时最多加深到的深度
+        maxSize:最多缓存的局面数
+        deeper:重复点击时是否加深搜索
+    """
+
+    def __init__(self, depth=4, maxDepth=6, maxSize=256, deeper=True):
+        self.depth = depth
+        self.maxDepth = maxDepth
+        self.maxSize = maxSize
+        self.deeper = deeper
+        self.cache = OrderedDict()  # {局面的键: searchResult}
+        self.worker = searchWorker()  # 提示使用的后台搜索
+        self.ponder = ponderer(depth=depth)  # 玩家思考时预先搜索当前局面以及按提示走之后可能出现的局面
+        self.ponderKey = None  # 正在预搜索的局面
+        self.lastKey = None  # 上一次点击Tip时的局面，用于判断是否重复点击
+        self.requested = False  # 是否点击过Tip，点击之前不预搜索
+
+    def store(self, key, result):
+        old = self.cache.get(key)
+        if old is None or result.depth >= old.depth:  # 只保留更深的结果
+            self.cache[key] = result
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.maxSize:
+            self.cache.popitem(last=False)
+
+    def request(self, board):
+        """
+        点击Tip
+        参数:
+            board:实例board界面
+        返回值:
+            缓存或预搜索命中时返回searchResult，否则在后台开始搜索并返回None
+        """
+        self.requested = True
+        key = board.key()
+        repeated = key == self.lastKey
+        self.lastKey = key
+        result = self.cache.get(key)
+        if result is None:
+            result = self.ponder.lookup(board)
+            if result is not None:
+                self.store(key, result)
+        if result is not None:
+            self.cache.move_to_end(key)
+            if repeated and self.deeper and result.depth < self.maxDepth and not self.worker.searching(board):
+                self.ponder.stop()
+                self.worker.submit(board, depth=result.depth + 1)  # 重复点击时在后台加深
+            return result
+        if not self.worker.searching(board):  # 同一局面已经在搜索时不重复提交
+            self.ponder.stop()  # 前台搜索优先
+            self.worker.submit(board, depth=self.depth)
+        return None
+
+    def poll(self, board):
+        """
+        每一帧调用一次，后台搜索完成时存入缓存
+        返回值:
+            新完成的searchResult，没有时返回None
+        """
+        result = self.worker.poll(board)
+        if result is not None:
+            self.store(board.key(), result)
+        return result
+
+    def idle(self, board):  # 点击过Tip之后，局面变化且没有前台搜索时开始预搜索
+        if self.requested and board.key() != self.ponderKey and not self.worker.busy():
+            self.ponderKey = board.key()
+            self.ponder.start(board)
+
+    def stop(self):  # 停止所有后台搜索，缓存保留；再次点击Tip之前不预搜索
+        self.worker.cancel()
+        self.ponder.stop()
+        self.ponderKey = None
+        self.requested = False
+
+
+tips = tipService()
+
+
+def tip_2048(board):
     """
     tip2048
     功能:
-        调用一次AI算法，计算一次下一步
+        从提示服务取得下一步，没有缓存时在后台开始计算，不等待结果，结果由poll_tip取得
     参数:
         board:实例board界面
-        gap:AI算法速度，默认50
     返回值:
-        operation+1:tip索引,对应tip文字地图中显示字符串
-    """
-    global lastTime
-    if int(time.time()*1000) - lastTime > gap:
-        lastTime = int(time.time()*1000)
-        
-        now = board
-        operation = getBestMove(now)
-        return operation+1
\ No newline at end of file
+        命中缓存时直接返回tip索引，否则返回0，搜索完成之前tip显示为空
+    """
+    result = tips.request(board)
+    if result is None:
+        return 0
+    return result.move+1
+
+
+def poll_tip(board, tip):
+    """
+    查询提示结果
+    功能:
+        每一帧调用一次，后台搜索完成时返回新的tip索引；棋盘已经变化时丢弃过期的搜索
+    参数:
+        board:实例board界面
+        tip:当前tip索引
+    返回值:
+        operation+1:tip索引,对应tip文字地图中显示字符串，没有新结果时返回tip
+    """
+    result = tips.poll(board)
+    if result is None:
+        return tip
+    return result.move+1
+
+
+def ponder_tip(board):
+    """
+    提示的预搜索
+    功能:
+        每一帧调用一次，点击过Tip之后，局面变化且没有前台搜索时，在后台预先搜索当前局面和按提示走之后可能出现的局面
+    参数:
+        board:实例board界面
+    """
+    tips.idle(board)
+
+
+def stop_tip():  # 离开Base模式时停止所有提示搜索
+    tips.stop()
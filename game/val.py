@@ -1,39 +1,45 @@
 import math
+import random
 from sys import _current_frames
+from game.map import transpose, decode, BitMap, bitIslands, maskComponents
 
 
-def evaluation(map, score=0):
-    # smoothWeight = 0.001  # 0.5
-    # mono2Weight = 0.001  # 0.03
-    # emptyWeight = 5  # 2.7
-    # maxWeight = 1  # 0.01
-    # disWeight = 0.5
-    # smoothWeight = 0.3  # 0.5
-    # mono2Weight = 0.5  # 0.03
-    # emptyWeight = 0  # 2.7
-    # maxWeight = 1  # 0.01
-    # disWeight = 0.5
-    smoothWeight = 0.1  # 0.5
-    mono2Weight = 1.0  # 0.03
-    emptyWeight = 2.7  # 2.7
-    maxWeight = 1  # 0.01
-    disWeight = 0
-    scoreWeight = 0
+# 评价函数中各项的权重
+# smoothWeight = 0.001  # 0.5
+# mono2Weight = 0.001  # 0.03
+# emptyWeight = 5  # 2.7
+# maxWeight = 1  # 0.01
+# disWeight = 0.5
+# smoothWeight = 0.3  # 0.5
+# mono2Weight = 0.5  # 0.03
+# emptyWeight = 0  # 2.7
+# maxWeight = 1  # 0.01
+# disWeight = 0.5
+smoothWeight = 0.1  # 0.5
+mono2Weight = 1.0  # 0.03
+emptyWeight = 2.7  # 2.7
+maxWeight = 1  # 0.01
+disWeight = 0
+scoreWeight = 0
+
+# 位置权重，用于dis_weight
+# wei=[[100,10,10,100],
+#     [10,1,1,10],
+#     [10,1,1,10],
+#     [100,10,10,100]]
+wei = [[12, 13, 25, 50],
+       [11, 10, 9, 8],
+       [4, 5, 6, 7],
+       [3, 2, 1, 0]]
+
 
+def evaluation(map, score=0):
     result = [disWeight*dis_weight(map), smoothWeight * smothness(map), mono2Weight *
               monotonicity(map), emptyWeight*math.log(empty_num(map)), maxWeight*max_num(map), scoreWeight*score]
     return result
 
 
 def dis_weight(map):
-    # wei=[[100,10,10,100],
-    #     [10,1,1,10],
-    #     [10,1,1,10],
-    #     [100,10,10,100]]
-    wei = [[12, 13, 25, 50],
-           [11, 10, 9, 8],
-           [4, 5, 6, 7],
-           [3, 2, 1, 0]]
     dis_sum = 0
     for j in range(4):
         for i in range(4):
@@ -153,6 +159,204 @@ def monotonicity(map):
     return max(totals[:2])+max(totals[2:])
 
 
+
+# 查表评价
+# 除dis_weight外，每一项都可以拆成每一行、每一列各自的贡献，所以对65536种行（4个4位指数）预先计算好
+# 评价一个位棋盘时只需要对4行和4列（转置后的4行）查表
+
+
+def _lineSmooth(line):  # 一行对smothness的贡献，与smothness中同一方向上的计算相同
+    lubricity = 0
+    for k in range(4):
+        if line[k] != 0:
+            if k >= 1:
+                lubricity -= abs(math.log2(line[k-1]+1) - math.log2(line[k]+1))
+            if k < 3:
+                lubricity -= abs(math.log2(line[k+1]+1) - math.log2(line[k]+1))
+    return lubricity
+
+
+def _lineMono(line):  # 一行对monotonicity的贡献，返回(totals[0], totals[1])部分
+    totals = [0, 0]
+    current = 0
+    next = current+1
+    while next < 4:
+        while next < 4 and line[next] == 0:
+            next += 1
+        if next >= 4:
+            next -= 1
+        currentValue = math.log2(line[current]) if line[current] != 0 else 0
+        nextValue = math.log2(line[next]) if line[next] != 0 else 0
+        if currentValue > nextValue:
+            totals[0] += nextValue-currentValue
+        else:
+            totals[1] += currentValue-nextValue
+        current = next
+        next += 1
+    return totals
+
+
+def _buildLineTables():
+    smooth = [0] * 65536
+    monoDown = [0] * 65536
+    monoUp = [0] * 65536
+    empty = [0] * 65536
+    maxValue = [0] * 65536
+    dis = [[0] * 65536 for i in range(4)] if disWeight != 0 else None
+    for row in range(65536):
+        line = [(row >> (4 * k)) & 0xF for k in range(4)]
+        line = [1 << e if e != 0 else 0 for e in line]
+        smooth[row] = _lineSmooth(line)
+        monoDown[row], monoUp[row] = _lineMono(line)
+        empty[row] = line.count(0)
+        maxValue[row] = max(line)
+        if dis is not None:  # dis_weight按行号有不同的权重，每一行单独一张表
+            for i in range(4):
+                dis[i][row] = sum(math.log2(line[j])*wei[i][j]
+                                  for j in range(4) if line[j] != 0)
+    return smooth, monoDown, monoUp, empty, maxValue, dis
+
+
+lineSmooth, lineMonoDown, lineMonoUp, lineEmpty, lineMax, lineDis = _buildLineTables()
+
+
+def tableEvaluation(board, score=0):
+    """
+    查表计算评价值
+    参数:
+        board:位棋盘整数，行对应evaluation中map的第一维
+    返回值:
+        与sum(evaluation(decode(board), score))相同的评价值
+    """
+    cols = transpose(board)
+    smooth = dis = 0
+    rowDown = rowUp = colDown = colUp = 0
+    empty = maxValue = 0
+    for i, shift in enumerate((0, 16, 32, 48)):
+        row = (board >> shift) & 0xFFFF
+        col = (cols >> shift) & 0xFFFF
+        smooth += lineSmooth[row] + lineSmooth[col]
+        rowDown += lineMonoDown[row]
+        rowUp += lineMonoUp[row]
+        colDown += lineMonoDown[col]
+        colUp += lineMonoUp[col]
+        empty += lineEmpty[row]
+        if lineMax[row] > maxValue:
+            maxValue = lineMax[row]
+        if lineDis is not None:
+            dis += lineDis[i][row]
+    return (disWeight*dis + smoothWeight*smooth + mono2Weight*(max(rowDown, rowUp)+max(colDown, colUp))
+            + emptyWeight*math.log(empty) + maxWeight*maxValue + scoreWeight*score)
+
+
+def tableSmothness(board):  # 查表计算smothness
+    cols = transpose(board)
+    lubricity = 0
+    for shift in (0, 16, 32, 48):
+        lubricity += lineSmooth[(board >> shift) & 0xFFFF] + \
+            lineSmooth[(cols >> shift) & 0xFFFF]
+    return lubricity
+
+
+LINE_SHIFTS = (0, 16, 32, 48)
+
+
+# min轮放置数字的打分
+# 在空格放置数字只改变它所在的一行和一列，smothness只需重新查这两条线，其余各线的查表结果不变，
+# 并按tableSmothness中相同的顺序求和，结果与整盘计算完全相同
+# islands只与该格子相邻的、数字相同的连通块有关：这些块与该格子合并为一块
+cellNeighbours = [[n for n in (k - 4, k + 4) if 0 <= n < 16] +
+                  [n for n in (k - 1, k + 1) if 0 <= n < 16 and n // 4 == k // 4]
+                  for k in range(16)]  # 每个格子的四连通相邻格子
+
+
+def spawnScores(board):
+    """
+    min轮每种放置方式的得分
+    功能:
+        与逐个放置后计算round(-tableSmothness(board) + bitIslands(board), 9)的结果相同，
+        但整盘的查表和islands只计算一次，每种放置方式只重新查所在的行和列，并只看相邻格子所在的连通块
+    参数:
+        board:位棋盘整数
+    返回值:
+        cells:空格列表[[i, j]]，顺序与BitMap.getAvailableCells相同
+        score_2,score_4:每个空格分别放置2、4之后的得分
+    """
+    cols = transpose(board)
+    rows = [(board >> shift) & 0xFFFF for shift in LINE_SHIFTS]
+    cols = [(cols >> shift) & 0xFFFF for shift in LINE_SHIFTS]
+    rowSmooth = [lineSmooth[row] for row in rows]
+    colSmooth = [lineSmooth[col] for col in cols]
+    exponents = [(board >> (4 * k)) & 0xF for k in range(16)]
+    baseIslands = bitIslands(board)
+    blocks = {}  # {指数: 该指数各连通块的掩码}
+    for e in (1, 2):
+        mask = 0
+        for k in range(16):
+            if exponents[k] == e:
+                mask |= 1 << k
+        blocks[e] = maskComponents(mask)
+    cells = []
+    score_2 = []
+    score_4 = []
+    for k in range(16):
+        if exponents[k] != 0:
+            continue
+        i, j = k // 4, k % 4
+        cells.append([i, j])
+        for e, scores in ((1, score_2), (2, score_4)):
+            newRow = lineSmooth[rows[i] | (e << (4 * j))]
+            newCol = lineSmooth[cols[j] | (e << (4 * i))]
+            lubricity = 0
+            for t in range(4):  # 与tableSmothness的求和顺序相同
+                lubricity += (newRow if t == i else rowSmooth[t]) + \
+                    (newCol if t == j else colSmooth[t])
+            near = 0  # 相邻的、指数同为e的格子
+            for n in cellNeighbours[k]:
+                if exponents[n] == e:
+                    near |= 1 << n
+            merged = 0
+            if near:
+                for block in blocks[e]:
+                    if block & near:
+                        merged += 1
+            scores.append(round(-lubricity + baseIslands + 1 - merged, 9))
+    return cells, score_2, score_4
+
+
+def randomBoard(rng, choices):  # 随机位棋盘，每个格子的指数从choices中随机选取，rng为random.Random
+    board = 0
+    for shift in range(0, 64, 4):
+        board |= rng.choice(choices) << shift
+    return board
+
+
+def testSpawnScores(times=5000, seed=0):  # 随机棋盘上检查spawnScores与逐个放置后整盘计算的结果完全相同
+    rng = random.Random(seed)
+    for i in range(times):
+        board = randomBoard(rng, [0, 0, 0, 1, 1, 1, 2, 2, 3, 5, 8])
+        cells, score_2, score_4 = spawnScores(board)
+        bitMap = BitMap(4, board=board)
+        assert cells == bitMap.getAvailableCells()
+        for [x, y], s2, s4 in zip(cells, score_2, score_4):
+            for value, score in ((2, s2), (4, s4)):
+                bitMap.add_xy(x, y, value)
+                assert score == round(-tableSmothness(bitMap.board) + bitMap.islands(), 9), decode(board)
+                bitMap.remove_xy(x, y)
+    return True
+
+
+def testTable(times=10000, seed=0):  # 随机棋盘上检查查表结果与原评价函数一致
+    rng = random.Random(seed)
+    for i in range(times):
+        board = randomBoard(rng, [0, 0, 0, 1, 1, 2, 3, 5, 8, 11, 15])
+        if board == 0 or '0' not in '%016x' % board:
+            continue  # 没有空格时原评价函数的log(0)无意义
+        map = decode(board)
+        assert abs(tableEvaluation(board) - sum(evaluation(map))) < 1e-9, map
+        assert abs(tableSmothness(board) - smothness(map)) < 1e-9, map
+    return True
+
 '''
 def  monotonicity(map):
     totals = [0, 0]#totals【0】储存单调增加，totals[1]储存单调递减
@@ -0,0 +1,93 @@
+import threading
+from game.search import searchMap, searchTimeout, boardMap
+from game.table import transTable
+
+
+class searchWorker:
+    """
+    后台搜索
+    功能:
+        在后台线程中调用searchMap，界面循环每一帧调用poll查询结果，搜索期间仍然可以处理事件和播放动画
+        棋盘改变或按下New后，正在进行的搜索会被取消，其结果不会再被返回
+    参数:
+        kwargs:传给searchMap的默认参数，如depth、budget、engine；默认使用单独的置换表，
+               AI、提示和预搜索的线程可能同时搜索，不能共用同一个置换表
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        if 'table' not in self.kwargs:
+            self.kwargs['table'] = transTable()
+        self.thread = None
+        self.cancelEvent = None
+        self.key = None  # 正在搜索或已搜索完成的局面
+        self.result = None  # 搜索完成后的searchResult
+        self.lock = threading.Lock()
+
+    def submit(self, board, **kwargs):
+        """
+        开始搜索一个局面，之前未完成的搜索会被取消
+        参数:
+            board:Board实例，提交时复制当前局面，之后board的变化不影响本次搜索
+            kwargs:覆盖默认参数
+        """
+        self.cancel()
+        options = dict(self.kwargs, **kwargs)
+        event = threading.Event()
+        with self.lock:
+            self.key = board.key()
+            self.cancelEvent = event
+        self.thread = threading.Thread(target=self.run, args=(
+            boardMap(board), self.key, event, options), daemon=True)
+        self.thread.start()
+
+    def run(self, nAIMap, key, event, options):  # 在后台线程中执行
+        try:
+            result = searchMap(nAIMap, cancel=event, **options)
+        except searchTimeout:  # 被取消
+            return
+        with self.lock:
+            if not event.is_set() and self.key == key:
+                self.result = result
+
+    def cancel(self):
+        """
+        取消正在进行的搜索并丢弃已完成的结果
+        等待旧线程退出，避免本对象的两个搜索同时使用同一个置换表
+        """
+        with self.lock:
+            if self.cancelEvent is not None:
+                self.cancelEvent.set()
+            self.cancelEvent = None
+            self.key = None
+            self.result = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def busy(self):  # 是否有正在进行的搜索
+        return self.thread is not None and self.thread.is_alive()
+
+    def searching(self, board):  # 是否正在搜索或已搜索完该局面
+        return self.key is not None and self.key == board.key()
+
+    def poll(self, board):
+        """
+        查询搜索结果
+        参数:
+            board:当前的Board实例，与提交时的局面不同则说明结果已经过期，取消搜索
+        返回值:
+            searchResult，还没有完成或已经过期时返回None；每个结果只返回一次
+        """
+        if self.key is None:
+            return None
+        if self.key != board.key():
+            self.cancel()
+            return None
+        with self.lock:
+            result = self.result
+            self.result = None
+        if result is not None:
+            self.thread = None
+            self.key = None
+        return result
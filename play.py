@@ -1,3 +1,4 @@
+import argparse
 from pygame.locals import *
 import pygame
 from show.show import *
@@ -8,6 +9,7 @@ def play():
     showAll(board, button = buttonGroup)  # 显示
     while True:
         for event in pygame.event.get():
+            checkExpose(event) # 窗口重新显示时整屏重画
             if event.type == pygame.QUIT:  # 退出
                 pygame.quit()
             clock.tick(60)
@@ -19,6 +21,11 @@ def play():
             showAll(board, button = buttonGroup) # 显示
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='2048')
+    parser.add_argument('-r', '--replay', default=None, help='录像文件，每一局追加在文件末尾')
+    args = parser.parse_args()
+    if args.replay is not None:
+        recordReplay(args.replay) # 记录之后的每一局
     
     pygame.display.set_caption("2048") # 设置窗口标题
     play() # 开始游戏
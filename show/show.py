@@ -1,8 +1,11 @@
-from numpy.core.shape_base import block
+import numpy as np
 import pygame
 import math
+from functools import lru_cache
 from board import *
+from animate.manager import manager
 from show.showConfig import *
+import show.showConfig as cfg  # 窗口、图像块和字体在cfg.init()之后才存在，通过模块属性访问
 
 
 def index2pixel(indexPos):
@@ -12,134 +15,273 @@ def index2pixel(indexPos):
         return (indexPos[0]*Pixel, (indexPos[1]+2)*Pixel)
 
 
+@lru_cache(maxsize=128)
+def renderText(font, text, color):
+    """渲染文字，同样的字体、内容和颜色只渲染一次"""
+    return font.render(text, True, color)
+
+
+tileCache = {}  # {数字: (预合成的块图像, 相对块左上角的偏移)}
+
+
+def tileSurface(num):
+    """
+    数字块的预合成图像
+    功能:
+        底色与居中的数字合成为一张图，每种数字只合成一次
+        数字比块宽时（如1024）图像会超出块的范围，超出部分透明，与直接绘制的结果相同
+    返回值:
+        (图像, 偏移)，绘制位置为块的左上角加上偏移
+    """
+    if num not in tileCache:
+        block = cfg.block_display[0 if num == 0 else min(int(math.log(num, 2)), 12)]
+        if num == 0:
+            tileCache[num] = (block, (0, 0))
+        else:
+            board_word = renderText(cfg.board_front, str(num),
+                                    numColorMap[0] if num == 2 or num == 4 else numColorMap[1])
+            board_rect = board_word.get_rect()
+            board_rect.center = (Pixel/2, Pixel/2)  # 居中显示
+            area = block.get_rect().union(board_rect)
+            if area == block.get_rect():  # 没有超出时使用不透明的图像，绘制更快
+                surface = block.copy()
+            else:
+                surface = pygame.Surface(area.size, pygame.SRCALPHA)
+                surface.blit(block, (-area.x, -area.y))
+            surface.blit(board_word, (board_rect.x-area.x, board_rect.y-area.y))
+            tileCache[num] = (surface, (area.x, area.y))
+    return tileCache[num]
+
+
+def tileOverflows(num):  # 数字块的图像是否超出块的范围
+    surface, offset = tileSurface(num)
+    return offset != (0, 0) or surface.get_size() != cfg.block_display[0].get_size()
+
+
 def showBotton(button):
     """按键显示"""
-    button[0].update(screen_display)
-    button[1].update(screen_display)
-    button[2].update(screen_display)
-    button[3].update(screen_display)
+    button[0].update(cfg.screen_display)
+    button[1].update(cfg.screen_display)
+    button[2].update(cfg.screen_display)
+    button[3].update(cfg.screen_display)
 
 
 def showOhters():
     """其他显示"""
      # 左上角‘2048’显示 #
-    _2048_word = my_2048_front.render('2048', True, my_word_color)
+    _2048_word = renderText(cfg.my_2048_front, '2048', my_word_color)
     board_word = _2048_word.get_rect()  # 位置
     board_word.center = (Pixel, Pixel/2)  # 居中显示
-    screen_display.blit(_2048_word, board_word)  # 显示
+    cfg.screen_display.blit(_2048_word, board_word)  # 显示
 
     # 设计者显示 #
-    designer_word = designer_front.render(
-        ('Designer:雷佳臻 赵广宇 王琪源 蒋晓天 何旭东'), True, my_word_color)
+    designer_word = renderText(
+        cfg.designer_front, 'Designer:雷佳臻 赵广宇 王琪源 蒋晓天 何旭东', my_word_color)
     board_word = designer_word.get_rect()  # 位置
     board_word.center = (180, 565)  # 居中显示
-    screen_display.blit(designer_word, board_word)  # 显示
+    cfg.screen_display.blit(designer_word, board_word)  # 显示
 
 
-def showScore(board: Board):
-    """分数显示"""
-    screen_display.blit(score_get_block, (Pixel * 3-20, 10))  # 显示块位置
+def scoreText(board: Board):
     if board.over() == True:  # 游戏结束
-        score_word = score_front.render('Game over', True, my_word_color)
-    else:
-        score_word = score_front.render(
-            '  Score:'+str(board.score), True, my_word_color)
+        return 'Game over'
+    return '  Score:'+str(board.score)
+
+
+def showScore(board: Board, text=None):
+    """分数显示，返回占用的区域"""
+    if text is None:
+        text = scoreText(board)
+    cfg.screen_display.blit(cfg.score_get_block, (Pixel * 3-20, 10))  # 显示块位置
+    score_word = renderText(cfg.score_front, text, my_word_color)
     board_word = score_word.get_rect()  # 位置
     board_word.center = (Pixel * 3+20, Pixel/3-5)
-    screen_display.blit(score_word, board_word)  # 显示
+    cfg.screen_display.blit(score_word, board_word)  # 显示
+    return board_word.union(cfg.score_get_block.get_rect(topleft=(Pixel * 3-20, 10)))
 
 def showTip(operation):
-    """提示显示"""
-    tip_word = tip_front.render(
-        tipWordMap[operation], True, my_word_color)
+    """提示显示，返回占用的区域"""
+    tip_word = renderText(cfg.tip_front, tipWordMap[operation], my_word_color)
     board_word = tip_word.get_rect()  # 位置
     board_word.center = (180, 150)  # 居中显示
-    screen_display.blit(tip_word, board_word)  # 显示
-
-
-def showNum(board_word_data, disPos):
-    """块数值"""
-    if board_word_data != 0:
-        if board_word_data == 2 or board_word_data ==4:
-            board_word = board_front.render(
-                str(board_word_data), True, numColorMap[0])  # 参数：内容，是否抗锯齿，颜色
-        else:
-            board_word = board_front.render(
-                str(board_word_data), True, numColorMap[1])  # 参数：内容，是否抗锯齿，颜色
-        board_rect = board_word.get_rect()  # 位置
-        board_rect.center = (disPos[0]+Pixel/2, disPos[1]+Pixel/2)  # 居中显示
-        screen_display.blit(board_word, board_rect)  # 显示
+    cfg.screen_display.blit(tip_word, board_word)  # 显示
+    return board_word
 
 
 def showBlock(pos, num=0):
-    """块"""
-    screen_display.blit(
-        block_display[0 if num == 0 else min(int(math.log(num, 2)), 12)], pos)
-    showNum(num, pos)
+    """块，使用预合成的图像"""
+    surface, offset = tileSurface(num)
+    cfg.screen_display.blit(surface, (pos[0]+offset[0], pos[1]+offset[1]))
 
 
-def slideProce(thisBlock: Block, posIndex, animateList: list):
-    if thisBlock.lastPos != posIndex:  # 如果位置对不上，即有新的动画
+def slideProce(thisBlock: Block, num, posIndex, slideList: list):
+    """
+    滑动动画的准备
+    功能:
+        需要时为数值块生成新的动画，并按绘制顺序把[动画编号, 固定位置, 数字, 所属块]加入slideList，
+        位置留到slideStep中与其他动画一起计算
+    """
+    # 如果位置对不上，即有新的动画；两帧之间移走又移回原位的块没有动画，生成一个原地不动的动画
+    if thisBlock.lastPos != posIndex or thisBlock.animate is None:
         thisBlock.addAnimate(index2pixel(
-            thisBlock.lastPos), index2pixel(posIndex), animeFrame)  # 则生成新的动画
+            thisBlock.lastPos), index2pixel(posIndex), cfg.animeFrame)  # 则生成新的动画
         thisBlock.lastPos = posIndex
-    displayPos = thisBlock.animate.move()  # 根据动画获得方块所在位置
 
     if thisBlock.animeType == 2:  # 如果是合并动画，会有两个方块
+        board_word_data = int(num/2)  # 数字保持倍增前
         if thisBlock.anotherPos != posIndex:  # 如果两个方块都要动的话
-
             thisBlock.addAnotherAnimate(index2pixel(
-                thisBlock.anotherPos), index2pixel(posIndex), animeFrame)
-            # 根据动画获得方块所在位置
-            anotherDisplayPos = thisBlock.anotherAnimate.move(
-            )
+                thisBlock.anotherPos), index2pixel(posIndex), cfg.animeFrame)
+            slideList.append(
+                [thisBlock.anotherAnimate, None, board_word_data, None])
         else:
-            anotherDisplayPos = index2pixel(posIndex)
-        board_word_data = int(thisBlock.num/2)  # 数字保持倍增前
-        animateList.append(
-            [anotherDisplayPos, board_word_data])
+            slideList.append(
+                [None, index2pixel(posIndex), board_word_data, None])
     elif thisBlock.animeType == 1:
-        board_word_data = int(thisBlock.num)  # 普通滑动动画，保持数字不变
+        board_word_data = int(num)  # 普通滑动动画，保持数字不变
+
+    slideList.append([thisBlock.animate, None, board_word_data, thisBlock])
+
 
-    animateList.append([displayPos, board_word_data])
+def slideStep(slideList: list):
+    """
+    滑动动画的一帧
+    功能:
+        用动画管理器一次算出所有动画本帧的位置，主动画已经完成的块animeType改为0
+    返回值:
+        按绘制顺序排列的[位置, 数字]列表
+    """
+    slots = [slot for [slot, pos, num, thisBlock] in slideList if slot is not None]
+    if len(slots) > 0:
+        positions, finished = manager.step(slots)
+        positions = positions.tolist()
+        finished = finished.tolist()
+    drawList = []
+    k = 0
+    for [slot, pos, num, thisBlock] in slideList:
+        if slot is not None:
+            pos = positions[k]
+            if thisBlock is not None and finished[k]:  # 如果动画已经完成，lastPos改为当前位置
+                thisBlock.animeType = 0
+            k += 1
+        drawList.append([pos, num])
+    return drawList
 
-    if thisBlock.animate.finished:  # 如果动画已经完成，lastPos改为当前位置
-        thisBlock.animeType = 0
+
+# 上一帧已经画到屏幕上的内容，showAll只重画与之相比发生变化的部分
+drawn = {'full': False,  # 是否已经整屏画过一次
+         'tiles': None,  # 画出的数值矩阵
+         'sliding': False,  # 上一帧是否有滑动动画
+         'score': None, 'scoreRect': None,  # 得分文字及其区域
+         'tip': None, 'tipRect': None,  # 提示索引及其区域
+         'buttons': None}  # 各按键的(悬停, 按下)状态
+
+boardRect = pygame.Rect(0, Pixel * 2-5, Pixel * show_x, Pixel * size_y + 5)  # 棋盘区域
+
+
+def invalidate():
+    """下一帧整屏重画，用于窗口被遮挡后恢复等情况"""
+    drawn['full'] = False
+
+
+# 窗口重新显示（被遮挡后露出、从最小化恢复、重新获得焦点）的事件，之后屏幕上原来的内容不再可靠
+exposeEvents = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN,
+                pygame.WINDOWRESTORED, pygame.ACTIVEEVENT)
+
+
+def checkExpose(event):  # 事件循环中对每个事件调用，窗口重新显示时下一帧整屏重画
+    if event.type in exposeEvents:
+        invalidate()
+
+
+def restore(rect):
+    """用顶部背景恢复一块区域，得分和提示都在顶部背景之上"""
+    cfg.screen_display.blit(cfg.show_display[0], rect, area=rect)
 
 
 def showAll(board: Board, button, operation = 0):
-    """显示所有"""
-    screen_display.blit(show_display[0], (0, 0))
-    screen_display.blit(show_display[1], (0, Pixel * 2-5))
-    screen_display.blit(show_display[2], (0, Pixel * 6))
+    """
+    显示所有
+    功能:
+        第一次整屏绘制，之后只重画发生变化的数值块、得分、提示和按键，并只更新这些区域
+        有滑动动画的帧以及动画结束后的一帧重画整个棋盘区域；没有变化的帧不绘制也不更新屏幕
+    返回值:
+        本帧滑动动画的个数
+    """
+    full = not drawn['full']
+    dirty = []
+    if full:
+        cfg.screen_display.blit(cfg.show_display[0], (0, 0))
+        cfg.screen_display.blit(cfg.show_display[1], (0, Pixel * 2-5))
+        cfg.screen_display.blit(cfg.show_display[2], (0, Pixel * 6))
 
     slideList = []
+    sliding = set()  # 有动画的位置，这些位置只画底色
     for i in range(size_x):
         for j in range(size_y):  # 遍历数值块，处理动画
-            screen_display.blit(
-                block_display[0], index2pixel([i, j]))  # 绘制底色（空位）
-            if board.map[i][j].num != 0:
-                # if [i, j] != list(board.map[i][j].lastPos):
+            if board.map[i][j] != 0:
                 # 如果不是零且lastPos不等于当前，证明需要滑动动画
-                if board.map[i][j].animeType == 1 or board.map[i][j].animeType == 2:
-                    slideProce(board.map[i][j], [i, j], slideList)
-                # else:
-                #     print('!debug!', board.map[i][j].animeType)
-                #     print('!debug!', board.map[i][j].lastPos, [i, j])
-                else:  # 不需要动画
-                    board_word_data = board.map[i][j].num
-                    displayPos = index2pixel([i, j])
-                    showBlock(displayPos, board_word_data)
-
-    # 最后绘制动画，防止在扫描过程中绘制动画导致的遮挡问题
-    for [pos, num] in slideList:
-        showBlock(pos, num)
-
-    showScore(board) # 显示得分
-    showBotton(button) # 显示按键
-    showOhters() # 显示其他
-    showTip(operation) # 显示提示
-
-    pygame.display.update()  # 更新显示
+                if board.blocks[i][j].animeType == 1 or board.blocks[i][j].animeType == 2:
+                    slideProce(board.blocks[i][j], board.map[i][j], [i, j], slideList)
+                    sliding.add((i, j))
+    slideList = slideStep(slideList)  # 所有动画在一次向量化计算中前进一帧
+    manager.tick()
+
+    changed = [] if full else np.argwhere(board.map != drawn['tiles']).tolist()
+    overflow = any(tileOverflows(int(board.map[i][j])) or tileOverflows(int(drawn['tiles'][i][j]))
+                   for [i, j] in changed)  # 数字超出块的范围时会画到相邻的位置上
+    if full or len(slideList) > 0 or drawn['sliding'] or overflow:  # 整个棋盘重画
+        if not full:
+            cfg.screen_display.blit(cfg.show_display[1], (0, Pixel * 2-5))
+            dirty.append(boardRect)
+        for i in range(size_x):
+            for j in range(size_y):
+                cfg.screen_display.blit(
+                    cfg.block_display[0], index2pixel([i, j]))  # 绘制底色（空位）
+                if board.map[i][j] != 0 and (i, j) not in sliding:  # 不需要动画
+                    showBlock(index2pixel([i, j]), board.map[i][j])
+        # 最后绘制动画，防止在扫描过程中绘制动画导致的遮挡问题
+        for [pos, num] in slideList:
+            showBlock(pos, num)
+    else:  # 只重画数字变化的块
+        for [i, j] in changed:
+            displayPos = index2pixel([i, j])
+            showBlock(displayPos, board.map[i][j])
+            dirty.append(pygame.Rect(displayPos, (Pixel-5, Pixel-5)))
+    drawn['tiles'] = board.map.copy()
+    drawn['sliding'] = len(slideList) > 0
+
+    text = scoreText(board)
+    if full or text != drawn['score']:
+        if not full:
+            restore(drawn['scoreRect'])
+            dirty.append(drawn['scoreRect'])
+        drawn['score'] = text
+        drawn['scoreRect'] = showScore(board, text) # 显示得分
+        dirty.append(drawn['scoreRect'])
+
+    states = [(b.rect.collidepoint(pygame.mouse.get_pos()), b.clicked) for b in button]
+    for k in range(len(button)):
+        if full or states[k] != drawn['buttons'][k]:
+            button[k].update(cfg.screen_display) # 显示按键
+            dirty.append(button[k].rect)
+    drawn['buttons'] = states
+
+    if full:
+        showOhters() # 显示其他
+
+    if full or operation != drawn['tip']:
+        if not full:
+            restore(drawn['tipRect'])
+            dirty.append(drawn['tipRect'])
+        drawn['tip'] = operation
+        drawn['tipRect'] = showTip(operation) # 显示提示
+        dirty.append(drawn['tipRect'])
+
+    if full:
+        pygame.display.update()  # 更新显示
+        drawn['full'] = True
+    elif len(dirty) > 0:
+        pygame.display.update(dirty)  # 只更新变化的区域
 
     return len(slideList)
@@ -1,6 +1,5 @@
-import pygame
-
-pygame.init()  # 在pygame.font.Font需要，所以需要先执行
+# 本模块导入时只定义常量，不导入pygame；窗口、图像块、字体和按键音效在init()中创建
+# 使用这些资源之前需要先调用一次init()，通过模块属性访问，如showConfig.screen_display
 
 Pixel = 90  # 单元块像素个数
 score_pixel = 100  # 得分显示区域纵像素个数
@@ -36,12 +35,6 @@ buttonColorMap = [(203, 193, 182),  # released
                   (239, 229, 219),  # hovor
                   (242, 179, 122)]   # clicked
 
-# 按键自定义风格设置 # 
-BUTTON_STYLE = {"hover_color" : buttonColorMap[1],
-                "clicked_color" : buttonColorMap[2],
-                "hover_sound" : pygame.mixer.Sound("./sound/sound.wav"),
-                "click_sound" : pygame.mixer.Sound("./sound/clicked.wav")}
-
 # 提示文字地图 #
 tipWordMap = [('Tip:'), # 空
               ('Tip:UP'),  # 向上
@@ -50,35 +43,68 @@ tipWordMap = [('Tip:'), # 空
               ('Tip:RIGHT'), # 向右
               ('Tip:GAME OVER!!!')]
               
-# 13个Suface实例块，略小于单元块大小，剩余的部分通过背景色实现边框填充
-block_display = [pygame.Surface((Pixel-5, Pixel-5)) for i in range(13)]
-
-for i in range(len(block_display)):
-    block_display[i].fill(myColorMap[i])
-
-# 主体窗口设置 # 
-screen_display = pygame.display.set_mode((Pixel * show_x, Pixel * designer_y))
-show_display = [pygame.Surface((Pixel * show_x, Pixel * 2)), pygame.Surface(
-    (Pixel * show_x, Pixel * size_y + 5)), pygame.Surface((Pixel * show_x, Pixel * 0.5))]
-show_display[0].fill((250, 248, 239))  # 给背景填充颜色，乳白
-show_display[1].fill((189, 177, 166))  # 给背景填充颜色，深灰
-show_display[2].fill((250, 248, 239))  # 给背景填充颜色，乳白
-
-# 得分部件设置 # 
-score_get_block = pygame.Surface((Pixel+10, 30))  # 得分实例
-score_get_block.fill((189, 177, 166))  # 填充颜色
-
-# 字体设置，字体及大小 # 
-start_front = pygame.font.Font(None, PIXEL * 2 // 6)  # 按钮
-button_front = pygame.font.Font(None, PIXEL * 2 // 6)  # 按钮
-board_front = pygame.font.Font(None, PIXEL * 2 // 3)  # 数值矩阵数值
-score_front = pygame.font.Font(None, PIXEL * 2 // 8)  # 得分
-my_2048_front = pygame.font.Font(None, PIXEL * 2 // 2)  # 2048
-designer_front = pygame.font.Font('./font/SimSun.ttf', 15)
-tip_front = pygame.font.Font(None, 25) #tip
-
 # 主体字体颜色 #
 my_word_color = (106, 90, 205)
 
  # 动画帧数 #
-animeFrame = 10 # 10较为丝滑
\ No newline at end of file
+animeFrame = 10 # 10较为丝滑
+
+# 以下资源由init()创建，之前为None #
+BUTTON_STYLE = None  # 按键自定义风格设置
+block_display = None  # 13个Suface实例块
+screen_display = None  # 主体窗口
+show_display = None
+score_get_block = None  # 得分实例
+start_front = button_front = board_front = score_front = None  # 字体
+my_2048_front = designer_front = tip_front = None
+
+
+def init():
+    """
+    初始化显示
+    功能:
+        初始化pygame，打开窗口并创建图像块、字体和按键风格；重复调用时不再重复创建
+        只使用棋盘和AI逻辑时不需要调用，也不会打开窗口
+    """
+    global BUTTON_STYLE, block_display, screen_display, show_display, score_get_block
+    global start_front, button_front, board_front, score_front, my_2048_front, designer_front, tip_front
+    if screen_display is not None:
+        return
+    import pygame
+    from sound.sound import sounds
+
+    pygame.init()  # 在pygame.font.Font需要，所以需要先执行
+
+    # 按键自定义风格设置 # 
+    BUTTON_STYLE = {"hover_color" : buttonColorMap[1],
+                    "clicked_color" : buttonColorMap[2],
+                    "hover_sound" : sounds.load("sound"),
+                    "click_sound" : sounds.load("clicked")}
+
+    # 13个Suface实例块，略小于单元块大小，剩余的部分通过背景色实现边框填充
+    block_display = [pygame.Surface((Pixel-5, Pixel-5)) for i in range(13)]
+
+    for i in range(len(block_display)):
+        block_display[i].fill(myColorMap[i])
+
+    # 主体窗口设置 # 
+    screen_display = pygame.display.set_mode((Pixel * show_x, Pixel * designer_y))
+    show_display = [pygame.Surface((Pixel * show_x, Pixel * 2)), pygame.Surface(
+        (Pixel * show_x, Pixel * size_y + 5)), pygame.Surface((Pixel * show_x, Pixel * 0.5))]
+    show_display[0].fill((250, 248, 239))  # 给背景填充颜色，乳白
+    show_display[1].fill((189, 177, 166))  # 给背景填充颜色，深灰
+    show_display[2].fill((250, 248, 239))  # 给背景填充颜色，乳白
+
+    # 得分部件设置 # 
+    score_get_block = pygame.Surface((Pixel+10, 30))  # 得分实例
+    score_get_block.fill((189, 177, 166))  # 填充颜色
+
+    # 字体设置，字体及大小 # 
+    start_front = pygame.font.Font(None, PIXEL * 2 // 6)  # 按钮
+    button_front = pygame.font.Font(None, PIXEL * 2 // 6)  # 按钮
+    board_front = pygame.font.Font(None, PIXEL * 2 // 3)  # 数值矩阵数值
+    score_front = pygame.font.Font(None, PIXEL * 2 // 8)  # 得分
+    my_2048_front = pygame.font.Font(None, PIXEL * 2 // 2)  # 2048
+    designer_front = pygame.font.Font('./font/SimSun.ttf', 15)
+    tip_front = pygame.font.Font(None, 25) #tip
+
@@ -0,0 +1,129 @@
+import argparse
+import csv
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game.map import BitMap
+from game.search import searchMap
+from game.table import transTable
+from game.replay import replayWriter, encodeHeader, encodeStep
+
+# 每局输出的字段
+FIELDS = ['seed', 'engine', 'depth', 'score',
+          'maxTile', 'moves', 'time', 'positions']
+
+
+def spawn(aiMap: BitMap, rng: random.Random):  # 与Board.add一致，随机空位上9/10为2，1/10为4
+    cells = aiMap.getAvailableCells()
+    [r, c] = rng.choice(cells)
+    value = rng.choice([2, 2, 2, 2, 2, 2, 2, 2, 2, 4])
+    aiMap.add_xy(r, c, value)
+    return r, c, value
+
+
+def playGame(seed, engine='minimax', depth=2, budget=None, record=False):
+    """
+    无界面完整地下一局
+    参数:
+        seed:随机种子，相同种子下生成的数字完全相同
+        engine:搜索引擎，'minimax'或'expectimax'
+        depth:搜索深度，给出budget时为最大深度
+        budget:每一步的时间预算，单位毫秒
+        record:是否记录录像
+    返回值:
+        本局结果的字典，字段见FIELDS；record为True时另有'replay'，为编码好的整局录像，由replayWriter.write写入
+    """
+    rng = random.Random(seed)
+    aiMap = BitMap(4, [[0] * 4 for i in range(4)])  # 空棋盘，开局的两个数字也由rng产生
+    spawn(aiMap, rng)
+    spawn(aiMap, rng)
+    replay = bytearray(encodeHeader(seed, aiMap.board)) if record else None
+    table = transTable() if engine == 'minimax' else None
+    moves = 0
+    positions = 0
+    startTime = time.time()
+    while not aiMap.over():
+        result = searchMap(aiMap, depth, table, budget, engine)
+        positions += result.positions
+        if result.move < 0 or not aiMap.move(result.move):
+            break
+        r, c, value = spawn(aiMap, rng)
+        if record:
+            replay.append(encodeStep(result.move, r, c, value))
+        moves += 1
+    game = {'seed': seed, 'engine': engine, 'depth': depth, 'score': aiMap.score,
+            'maxTile': max(max(row) for row in aiMap.map), 'moves': moves,
+            'time': round(time.time() - startTime, 3), 'positions': positions}
+    if record:
+        game['replay'] = bytes(replay)
+    return game
+
+
+def simulate(games, engine='minimax', depth=2, seed=0, workers=1, budget=None, record=False):
+    """
+    批量自我对弈
+    参数:
+        games:对局数，第i局的种子为seed+i
+        workers:并行进程数，为1时在当前进程中运行
+        其余参数与playGame相同
+    返回值:
+        逐局产生结果的生成器
+    """
+    seeds = range(seed, seed + games)
+    if workers == 1:
+        for nowSeed in seeds:
+            yield playGame(nowSeed, engine, depth, budget, record)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(playGame, seeds, [engine] * games, [depth] * games, [budget] * games,
+                                    [record] * games)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='headless 2048 self-play')
+    parser.add_argument('-n', '--games', type=int, default=10, help='对局数')
+    parser.add_argument('-e', '--engine', default='minimax',
+                        choices=['minimax', 'expectimax'], help='搜索引擎')
+    parser.add_argument('-d', '--depth', type=int, default=2, help='搜索深度')
+    parser.add_argument('-b', '--budget', type=int, default=None,
+                        help='每一步的时间预算（毫秒），给出时使用迭代加深，depth为最大深度')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='第一局的随机种子')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='并行进程数')
+    parser.add_argument('-o', '--output', default='simulate.jsonl',
+                        help='结果文件，.csv或.jsonl')
+    parser.add_argument('-r', '--replay', default=None,
+                        help='录像文件，每一局追加在文件末尾，用game.replay.replayFile读取')
+    args = parser.parse_args()
+
+    results = []
+    replay = replayWriter(args.replay) if args.replay is not None else None
+    with open(args.output, 'w', newline='') as f:
+        if args.output.endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+        for result in simulate(args.games, args.engine, args.depth, args.seed, args.workers, args.budget,
+                               replay is not None):
+            if replay is not None:
+                replay.write(result.pop('replay'))
+                replay.flush()
+            if args.output.endswith('.csv'):
+                writer.writerow(result)
+            else:
+                f.write(json.dumps(result) + '\n')
+            f.flush()  # 逐局写入，中途停止也能保留已完成的结果
+            results.append(result)
+            print(result)
+    if replay is not None:
+        replay.close()
+
+    if len(results) == 0:  # 没有完成任何一局，没有平均分和最大数字
+        print('games: 0')
+        return
+    scores = [result['score'] for result in results]
+    print('games: {}  average score: {:.1f}  max tile: {}'.format(
+        len(results), sum(scores) / len(scores), max(result['maxTile'] for result in results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,91 @@
+import os
+import time
 import pygame
 
+
+class nullSound:  # 没有音频设备时使用的空音效，播放时什么也不做
+    def play(self):
+        pass
+
+
+class soundManager:
+    """
+    音效管理
+    功能:
+        每个音效第一次播放时从磁盘加载一次，之后重复使用；每个音效占用一个保留的声道，
+        新的播放打断同一音效上一次的播放，快速连续播放时不会占满所有声道
+        没有音频设备（mixer初始化失败或SDL_AUDIODRIVER为dummy）时所有音效都为空音效，不加载任何文件
+    参数:
+        path:音效文件所在目录
+        names:音效名称，对应path下的name.wav
+    """
+
+    def __init__(self, path='./sound', names=('slided', 'failed')):
+        self.path = path
+        self.names = list(names)
+        self.sounds = {}  # {名称: Sound或nullSound}
+        self.channels = {}  # {名称: 保留的声道}
+        self.lastPlay = {}  # {名称: 上一次播放的时间(ms)}
+        self.enabled = None  # 是否有音频设备，第一次播放时判断
+        self.muted = False
+
+    def available(self):  # 判断一次是否有可用的音频设备
+        if self.enabled is None:
+            if os.environ.get('SDL_AUDIODRIVER') == 'dummy':
+                self.enabled = False
+            else:
+                try:
+                    if not pygame.mixer.get_init():
+                        pygame.mixer.init()
+                    pygame.mixer.set_reserved(len(self.names))  # 按键音效不会占用这些声道
+                    self.enabled = True
+                except pygame.error:
+                    self.enabled = False
+        return self.enabled
+
+    def load(self, name):
+        if name not in self.sounds:
+            if self.available():
+                self.sounds[name] = pygame.mixer.Sound(
+                    os.path.join(self.path, name + '.wav'))
+                if name in self.names:
+                    self.channels[name] = pygame.mixer.Channel(
+                        self.names.index(name))
+            else:
+                self.sounds[name] = nullSound()
+        return self.sounds[name]
+
+    def play(self, name, minGap=0):
+        """
+        播放音效
+        参数:
+            name:音效名称
+            minGap:与同一音效上一次播放至少间隔的毫秒数，用于AI快速移动时限制播放频率
+        """
+        if self.muted:
+            return
+        now = int(time.time()*1000)
+        if minGap > 0 and now - self.lastPlay.get(name, -minGap) < minGap:
+            return
+        self.lastPlay[name] = now
+        sound = self.load(name)
+        if name in self.channels:
+            self.channels[name].play(sound)
+        else:
+            sound.play()
+
+    def mute(self, muted=True):
+        self.muted = muted
+
+
+sounds = soundManager()
+
+
 def failSound():
     """失败音效触发函数"""
-    pygame.mixer.Sound("./sound/failed.wav").play()
+    sounds.play('failed')
+
 
-def slideSound():
-    """滑动音效触发函数"""
-    pygame.mixer.Sound("./sound/slided.wav").play()
\ No newline at end of file
+def slideSound(minGap=0):
+    """滑动音效触发函数，minGap为与上一次滑动音效至少间隔的毫秒数"""
+    sounds.play('slided', minGap)